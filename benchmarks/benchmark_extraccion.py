@@ -0,0 +1,129 @@
+"""Benchmark de extremo a extremo contra el servidor simulado (benchmarks/servidor_mock.py).
+
+Ejecuta main.QureoApp en modo headless para cada combinación de concurrencia, páginas por colegio y modo
+de extracción, y mide el tiempo total, el de la extracción, el de la etapa de reporte (lo que queda tras
+la extracción: cierre del Excel y gráficos) y los estudiantes por segundo.
+
+Uso: python benchmarks/benchmark_extraccion.py [--colegios 4] [--estudiantes 60] [--latencia 0.03]
+     [--fallos 0.0] [--concurrencia 1,3] [--paginas 1,4] [--modos dom,red] [--json resultados.json]
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import main  # noqa: E402
+from servidor_mock import ServidorMock  # noqa: E402
+
+
+class AppMedida(main.QureoApp):
+    """QureoApp que además mide el tiempo de pared de la extracción de los colegios."""
+
+    segundos_extraccion = 0.0
+
+    def procesar_colegios_concurrente(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return super().procesar_colegios_concurrente(*args, **kwargs)
+        finally:
+            self.segundos_extraccion = time.perf_counter() - inicio
+
+
+def lista_enteros(texto):
+    return [int(v) for v in texto.split(",") if v.strip()]
+
+
+def ejecutar(servidor, concurrencia, paginas, modo):
+    """Ejecuta una pasada completa en un directorio temporal (sin sesiones, almacén ni historial previos)."""
+    main.BASE_URL = servidor.url
+    main.MAX_COLEGIOS_CONCURRENTES = concurrencia
+    main.TAMANO_POOL_PAGINAS = paginas
+    main.MODO_EXTRACCION = modo
+
+    directorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="qureo_bench_") as directorio:
+        os.chdir(directorio)
+        try:
+            servidor.guardar_credenciales("credenciales.xlsx")
+            app = AppMedida(ruta_credenciales="credenciales.xlsx")
+            app.ruta_metricas = ""
+            inicio = time.perf_counter()
+            codigo = app.procesar_colegios()
+            total = time.perf_counter() - inicio
+        finally:
+            os.chdir(directorio_original)
+
+    metricas = app.metricas.como_dict()
+    estudiantes = sum(datos["estudiantes"] for datos in metricas["colegios"].values())
+    fases = metricas["fases"]
+    return {
+        "concurrencia": concurrencia,
+        "paginas": paginas,
+        "modo": modo,
+        "codigo_salida": codigo,
+        "estudiantes": estudiantes,
+        "segundos_total": total,
+        "segundos_extraccion": app.segundos_extraccion,
+        "segundos_reporte": total - app.segundos_extraccion,
+        "segundos_escritura_excel": fases.get("escritura_excel", {}).get("segundos", 0.0),
+        "segundos_graficos": fases.get("graficos", {}).get("segundos", 0.0),
+        "estudiantes_por_segundo": estudiantes / app.segundos_extraccion if app.segundos_extraccion else 0.0,
+        "reintentos": metricas["reintentos"]
+    }
+
+
+def main_benchmark(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--colegios", type=int, default=4)
+    parser.add_argument("--estudiantes", type=int, default=60, help="Estudiantes por colegio.")
+    parser.add_argument("--por-pagina", type=int, default=10)
+    parser.add_argument("--latencia", type=float, default=0.03, help="Segundos de espera por petición en el servidor.")
+    parser.add_argument("--variacion", type=float, default=0.02)
+    parser.add_argument("--fallos", type=float, default=0.0, help="Probabilidad de error 500 en las páginas de estudiante.")
+    parser.add_argument("--especiales", type=int, default=0,
+                        help="Cuántos colegios usan los nombres de COLEGIOS_ESPECIALES (lista visible tras el login).")
+    parser.add_argument("--concurrencia", type=lista_enteros, default=[1, main.MAX_COLEGIOS_CONCURRENTES])
+    parser.add_argument("--paginas", type=lista_enteros, default=[1, main.TAMANO_POOL_PAGINAS])
+    parser.add_argument("--modos", default="dom,red")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--json", metavar="RUTA", help="Guarda los resultados en JSON para compararlos entre cambios.")
+    parser.add_argument("--verboso", action="store_true", help="Mantiene el log INFO de main.py.")
+    args = parser.parse_args(argv)
+
+    if not args.verboso:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    especiales = main.COLEGIOS_ESPECIALES[:max(0, args.especiales)]
+    servidor = ServidorMock(
+        colegios=args.colegios, estudiantes=args.estudiantes, por_pagina=args.por_pagina, latencia=args.latencia,
+        variacion=args.variacion, tasa_fallos=args.fallos, nombres=especiales, lista_directa=especiales,
+        semilla=args.semilla
+    )
+    modos = [m.strip() for m in args.modos.split(",") if m.strip()]
+    resultados = []
+    with servidor:
+        print(f"Servidor simulado en {servidor.url}: {args.colegios} colegios, {servidor.total_estudiantes} estudiantes, "
+              f"latencia {args.latencia}+{args.variacion} s, fallos {args.fallos:.0%}")
+        print(f"{'conc':>4} {'pág':>4} {'modo':>4} {'total s':>8} {'extr. s':>8} {'rep. s':>7} {'est/s':>7} {'reint':>5} {'salida':>6}")
+        for concurrencia, paginas, modo in itertools.product(args.concurrencia, args.paginas, modos):
+            r = ejecutar(servidor, concurrencia, paginas, modo)
+            resultados.append(r)
+            print(f"{concurrencia:>4} {paginas:>4} {modo:>4} {r['segundos_total']:>8.2f} {r['segundos_extraccion']:>8.2f} "
+                  f"{r['segundos_reporte']:>7.2f} {r['estudiantes_por_segundo']:>7.1f} {r['reintentos']:>5} {r['codigo_salida']:>6}")
+        peticiones = servidor.resumen()
+    print(f"Peticiones al servidor: {peticiones}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"parametros": vars(args), "resultados": resultados, "peticiones": peticiones}, f, ensure_ascii=False, indent=1)
+        print(f"Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,86 @@
+"""Benchmark de memoria de la acumulación de filas: lista de dicts + DataFrame (implementación anterior) frente a
+main.AcumuladorFilas, para colegios de distinto tamaño.
+
+Uso: python benchmarks/benchmark_memoria.py [--estudiantes 1000,10000,50000]
+"""
+import argparse
+import os
+import random
+import sys
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import main  # noqa: E402
+
+CURSOS = [("Curso para principiantes", 24), ("Curso de JavaScript", 18)]
+
+
+def generar_estudiantes(estudiantes, semilla=0):
+    """Genera [(orden, filas)] como las que produce QureoApp.filas_estudiante (2 cursos por estudiante)."""
+    azar = random.Random(semilla)
+    for i in range(estudiantes):
+        grado, seccion = str(azar.randint(1, 6)), azar.choice("ABCDE")
+        nombre = f"Estudiante {i}"
+        yield i, [
+            (f"{grado}-{seccion}", grado, seccion, nombre, curso, f"{azar.randint(0, total)}/{total}")
+            for curso, total in CURSOS
+        ]
+
+
+def con_dicts(estudiantes):
+    """Implementación anterior: un dict por fila y DataFrame + preparar_datos_colegio al final."""
+    datos = []
+    for _, filas in generar_estudiantes(estudiantes):
+        for fila in filas:
+            datos.append(dict(zip(main.AcumuladorFilas.COLUMNAS, fila)))
+    return main.preparar_datos_colegio(pd.DataFrame(datos))
+
+
+def con_acumulador(estudiantes):
+    acumulador = main.AcumuladorFilas()
+    for orden, filas in generar_estudiantes(estudiantes):
+        acumulador.agregar(orden, filas)
+    return main.preparar_datos_colegio(acumulador.a_dataframe())
+
+
+def resumen(df, curso):
+    """Hoja _Resumen_ de un curso con el Aula como texto, para comparar ambas implementaciones."""
+    df_resumen = main.calcular_resumen_por_aula(df[df["Curso"] == curso])
+    return df_resumen.assign(Aula=df_resumen["Aula"].astype(str)).reset_index(drop=True)
+
+
+def medir(funcion, estudiantes):
+    """Pico de memoria durante la acumulación y memoria del DataFrame resultante, en MiB."""
+    tracemalloc.start()
+    df = funcion(estudiantes)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pico / 2 ** 20, df.memory_usage(deep=True).sum() / 2 ** 20, df
+
+
+def main_benchmark(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--estudiantes", default="1000,10000,50000")
+    args = parser.parse_args(argv)
+
+    print(f"{'estudiantes':>11} {'dicts pico':>11} {'dicts df':>9} {'acum. pico':>11} {'acum. df':>9} {'B/est. acum.':>12}")
+    for estudiantes in [int(v) for v in args.estudiantes.split(",") if v.strip()]:
+        pico_dicts, df_dicts, esperado = medir(con_dicts, estudiantes)
+        pico_acum, df_acum, obtenido = medir(con_acumulador, estudiantes)
+        # Ambas implementaciones deben producir los mismos datos
+        pd.testing.assert_frame_equal(
+            esperado[obtenido.columns].astype(str), obtenido.astype(str), check_categorical=False
+        )
+        # y las mismas hojas de resumen, en el mismo orden de aulas
+        for curso, _ in CURSOS:
+            pd.testing.assert_frame_equal(
+                resumen(esperado, curso), resumen(obtenido, curso), check_dtype=False, check_categorical=False
+            )
+        print(f"{estudiantes:>11} {pico_dicts:>10.1f}M {df_dicts:>8.1f}M {pico_acum:>10.1f}M {df_acum:>8.1f}M "
+              f"{pico_acum * 2 ** 20 / estudiantes:>12.0f}")
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,117 @@
+"""Benchmark de la etapa de reporte: implementación por filas (apply) frente a la vectorizada de main.py.
+
+Uso: python benchmarks/benchmark_reporte.py [--filas 100000] [--repeticiones 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import main  # noqa: E402
+
+
+def generar_datos(filas, semilla=0):
+    """Genera filas sintéticas con la forma de `datos` (2 cursos por estudiante)."""
+    rng = np.random.default_rng(semilla)
+    estudiantes = filas // 2
+    aulas = [f"{g}-{s}" for g in range(1, 7) for s in "ABCDE"]
+    aula = rng.choice(aulas, estudiantes)
+    totales = {"Curso para principiantes": 24, "Curso de JavaScript": 18}
+    registros = {"Aula": [], "Grado": [], "Sección": [], "Estudiante": [], "Curso": [], "Capítulos finalizados": []}
+    for i in range(estudiantes):
+        grado, seccion = aula[i].split("-")
+        for curso, total in totales.items():
+            registros["Aula"].append(aula[i])
+            registros["Grado"].append(grado)
+            registros["Sección"].append(seccion)
+            registros["Estudiante"].append(f"Estudiante {i}")
+            registros["Curso"].append(curso)
+            # Algunas filas sin formato "x/y", como las de error o cursos sin progreso
+            registros["Capítulos finalizados"].append("0" if i % 50 == 0 else f"{rng.integers(0, total + 1)}/{total}")
+    return pd.DataFrame(registros)
+
+
+def reporte_por_filas(df_actual, df_prev):
+    """Implementación original con apply por fila y lambda en groupby.agg (referencia)."""
+    def parse_capitulos(caps):
+        try:
+            if "/" in str(caps):
+                completados, total = map(int, caps.split("/"))
+                return completados, total
+            return 0, 0
+        except Exception:
+            return 0, 0
+
+    df_actual = df_actual.copy()
+    df_actual[["Capítulos completados", "Total capítulos"]] = df_actual["Capítulos finalizados"].apply(parse_capitulos).apply(pd.Series)
+    df_prev = df_prev[main.COLUMNAS_CLAVE + ["Capítulos finalizados"]].copy()
+    df_prev[["Capítulos completados_prev", "Total capítulos_prev"]] = df_prev["Capítulos finalizados"].apply(parse_capitulos).apply(pd.Series)
+    df_merged = df_actual.merge(df_prev.drop(columns="Capítulos finalizados"), on=main.COLUMNAS_CLAVE, how="left")
+    df_merged["Capítulos completados_prev"] = df_merged["Capítulos completados_prev"].fillna(0)
+    df_merged["Avance"] = df_merged.apply(lambda row: "Sí" if row["Capítulos completados"] > row["Capítulos completados_prev"] else "No", axis=1)
+
+    resumenes = []
+    for plataforma in df_actual["Curso"].unique():
+        df_plataforma = df_actual[df_actual["Curso"] == plataforma]
+        resumen = df_plataforma.groupby("Aula").agg(
+            Total_Estudiantes=("Estudiante", "count"),
+            Avance_Promedio=("Capítulos completados", "mean"),
+            Capítulo_Más_Común=("Capítulos completados", lambda x: x.mode()[0] if not x.mode().empty else 0),
+            Total_Capítulos=("Total capítulos", "max")
+        ).reset_index()
+        resumen["Mensaje_Mayoría"] = resumen.apply(
+            lambda row: f"La mayoría de estudiantes está por el capítulo {int(row['Capítulo_Más_Común'])} de {int(row['Total_Capítulos'])}", axis=1
+        )
+        resumenes.append(resumen)
+    return df_merged["Avance"], resumenes
+
+
+def reporte_vectorizado(df_actual, df_prev):
+    df_actual = main.preparar_datos_colegio(df_actual)
+    avance = main.calcular_hoja_avance(df_actual, main.hoja_anterior_a_previa(df_prev))["Avance"]
+    resumenes = [
+        main.calcular_resumen_por_aula(df_actual[df_actual["Curso"] == plataforma])
+        for plataforma in df_actual["Curso"].unique()
+    ]
+    return avance, resumenes
+
+
+def medir(funcion, repeticiones, *args):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos), resultado
+
+
+def main_benchmark(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--filas", type=int, default=100000)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    df_actual = generar_datos(args.filas, semilla=1)
+    df_prev = generar_datos(args.filas, semilla=2)
+
+    t_filas, (avance_filas, resumenes_filas) = medir(reporte_por_filas, args.repeticiones, df_actual, df_prev)
+    t_vect, (avance_vect, resumenes_vect) = medir(reporte_vectorizado, args.repeticiones, df_actual, df_prev)
+
+    # Ambas implementaciones deben producir las mismas hojas
+    assert list(avance_filas) == list(avance_vect), "La columna Avance difiere"
+    for esperado, obtenido in zip(resumenes_filas, resumenes_vect):
+        obtenido = obtenido.assign(Aula=obtenido["Aula"].astype(str))
+        pd.testing.assert_frame_equal(esperado, obtenido, check_dtype=False)
+
+    print(f"Filas: {len(df_actual)}")
+    print(f"Por filas (apply):  {t_filas:.3f} s")
+    print(f"Vectorizado:        {t_vect:.3f} s")
+    print(f"Aceleración:        {t_filas / t_vect:.1f}x")
+
+
+if __name__ == "__main__":
+    main_benchmark()
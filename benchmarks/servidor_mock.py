@@ -0,0 +1,390 @@
+"""Servidor local que imita las páginas de sa-admin.qureo.education que usa main.py.
+
+Reproduce /login (userId, userPassword), /schoolinfo/students (tabla paginada de MUI con el botón
+"next page") y /students/<id> (acordeones MuiAccordion con los capítulos "finalizados"). Las páginas
+cargan sus datos con fetch desde /api/..., igual que la plataforma, así que sirven para los modos
+"dom" y "red". Permite configurar colegios, estudiantes, latencia y fallos.
+
+Uso: python benchmarks/servidor_mock.py [--colegios 3] [--estudiantes 50] [--latencia 0.05]
+     [--fallos 0.02] [--credenciales credenciales_mock.xlsx]
+Luego: QUREO_BASE_URL=http://127.0.0.1:8765 python main.py --headless --credenciales credenciales_mock.xlsx
+"""
+import argparse
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Cursos de cada estudiante: (título, total de capítulos). El último no es relevante para el reporte.
+CURSOS = [("Curso para principiantes", 24), ("Curso de JavaScript", 18), ("Curso de robótica", 10)]
+AULAS = [f"{grado}-{seccion}" for grado in range(1, 7) for seccion in "ABC"]
+
+PAGINA_LOGIN = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Qureo - Login</title></head>
+<body>
+<form method="post" action="/login">
+<input name="userId" type="text"><input name="userPassword" type="password">
+<button type="submit">Ingresar</button>
+</form>
+{error}
+</body></html>"""
+
+PAGINA_INICIO = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Qureo - {colegio}</title></head>
+<body><nav><a href="/schoolinfo/students">Estudiantes</a></nav><h1>{colegio}</h1></body></html>"""
+
+# La tabla se dibuja en el cliente al recibir /api/schoolinfo/students, como en la plataforma
+PAGINA_LISTA = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Qureo - Estudiantes</title></head>
+<body>
+<nav><a href="/schoolinfo/students">Estudiantes</a></nav>
+<div id="acciones"></div>
+<table class="MuiTable-root"><tbody id="filas"></tbody></table>
+<div class="MuiTablePagination-actions">
+<button id="anterior" aria-label="Go to previous page" class="MuiButtonBase-root MuiIconButton-root Mui-disabled">&lsaquo;</button>
+<button id="siguiente" aria-label="Go to next page" class="MuiButtonBase-root MuiIconButton-root">&rsaquo;</button>
+</div>
+<script>
+const CLASE_BOTON = "MuiButtonBase-root MuiIconButton-root";
+let pagina = 0;
+function cargar(p) {
+    fetch("/api/schoolinfo/students?page=" + p).then(r => r.json()).then(datos => {
+        pagina = datos.page;
+        const ultima = (datos.page + 1) * datos.rowsPerPage >= datos.total;
+        document.getElementById("siguiente").className = CLASE_BOTON + (ultima ? " Mui-disabled" : "");
+        document.getElementById("anterior").className = CLASE_BOTON + (datos.page === 0 ? " Mui-disabled" : "");
+        const acciones = document.getElementById("acciones");
+        acciones.replaceChildren();
+        const nuevo = document.createElement("a");
+        nuevo.href = "/students/new";
+        nuevo.textContent = "Añadir estudiante";
+        acciones.appendChild(nuevo);
+        const filas = document.getElementById("filas");
+        filas.replaceChildren();
+        for (const estudiante of datos.rows) {
+            const fila = document.createElement("tr");
+            const celdaNombre = document.createElement("td");
+            const enlace = document.createElement("a");
+            enlace.href = "/students/" + estudiante.studentId;
+            enlace.textContent = estudiante.studentName;
+            celdaNombre.appendChild(enlace);
+            const celdaAula = document.createElement("td");
+            celdaAula.textContent = estudiante.className;
+            fila.append(celdaNombre, celdaAula);
+            filas.appendChild(fila);
+        }
+    });
+}
+document.getElementById("siguiente").addEventListener("click", e => {
+    if (!e.currentTarget.className.includes("Mui-disabled")) cargar(pagina + 1);
+});
+document.getElementById("anterior").addEventListener("click", e => {
+    if (!e.currentTarget.className.includes("Mui-disabled")) cargar(pagina - 1);
+});
+cargar(0);
+</script>
+</body></html>"""
+
+# Los acordeones se dibujan al recibir /api/students/<id>/courses; el progreso solo se monta al expandir
+PAGINA_ESTUDIANTE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Qureo - Estudiante</title></head>
+<body>
+<div id="cursos"></div>
+<script>
+fetch("/api/students/" + {id_json} + "/courses").then(r => r.json()).then(datos => {
+    const contenedor = document.getElementById("cursos");
+    for (const curso of datos.courses) {
+        const acordeon = document.createElement("div");
+        acordeon.className = "MuiPaper-root MuiAccordion-root";
+        const resumen = document.createElement("div");
+        resumen.className = "MuiButtonBase-root MuiAccordionSummary-root";
+        resumen.setAttribute("role", "button");
+        resumen.setAttribute("aria-expanded", "false");
+        const titulo = document.createElement("h3");
+        titulo.textContent = curso.courseTitle;
+        resumen.appendChild(titulo);
+        resumen.addEventListener("click", () => {
+            if (resumen.getAttribute("aria-expanded") === "true") return;
+            resumen.setAttribute("aria-expanded", "true");
+            const detalle = document.createElement("div");
+            detalle.className = "MuiAccordionDetails-root";
+            const etiqueta = document.createElement("div");
+            etiqueta.textContent = "Capítulos finalizados";
+            const valor = document.createElement("div");
+            valor.textContent = curso.completedChapters + "/" + curso.totalChapters;
+            detalle.append(etiqueta, valor);
+            acordeon.appendChild(detalle);
+        });
+        acordeon.appendChild(resumen);
+        contenedor.appendChild(acordeon);
+    }
+});
+</script>
+</body></html>"""
+
+
+class ServidorMock:
+    """Servidor HTTP en un hilo con datos sintéticos y deterministas (según `semilla`).
+
+    `latencia` y `variacion` son segundos que se esperan en cada petición (latencia + uniforme(0, variacion));
+    `tasa_fallos` es la probabilidad de responder 500 en las páginas y la API de detalle de estudiante.
+    Los colegios de `lista_directa` muestran la lista de estudiantes justo después del login."""
+
+    def __init__(self, colegios=3, estudiantes=50, por_pagina=10, latencia=0.0, variacion=0.0, tasa_fallos=0.0,
+                 nombres=None, lista_directa=(), semilla=0, host="127.0.0.1", puerto=0):
+        self.por_pagina = max(1, por_pagina)
+        self.latencia = latencia
+        self.variacion = variacion
+        self.tasa_fallos = tasa_fallos
+        self.lista_directa = set(lista_directa)
+        self.host = host
+        self.puerto = puerto
+        self.sesiones = {}  # token -> nombre del colegio
+        self.peticiones = Counter()
+        self._lock = threading.Lock()
+        self._azar = random.Random(semilla + 1)  # latencia y fallos, separado de los datos
+        self._servidor = None
+        self._hilo = None
+
+        azar = random.Random(semilla)
+        nombres = list(nombres or [])
+        self.colegios = {}
+        self.estudiantes = {}  # id -> (colegio, datos del estudiante)
+        for c in range(colegios):
+            nombre = nombres[c] if c < len(nombres) else f"COLEGIO MOCK {c + 1}"
+            lista = []
+            for e in range(estudiantes):
+                id_estudiante = f"{c + 1:03d}{e + 1:05d}"
+                estudiante = {
+                    "id": id_estudiante,
+                    "nombre": f"Estudiante {c + 1}-{e + 1}",
+                    "aula": azar.choice(AULAS),
+                    "cursos": [(titulo, azar.randint(0, total), total) for titulo, total in CURSOS]
+                }
+                lista.append(estudiante)
+                self.estudiantes[id_estudiante] = (nombre, estudiante)
+            self.colegios[nombre] = {"usuario": f"usuario{c + 1}", "contrasena": f"clave{c + 1}", "estudiantes": lista}
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.puerto}"
+
+    @property
+    def total_estudiantes(self):
+        return len(self.estudiantes)
+
+    def credenciales(self):
+        """[(colegio, usuario, contraseña)] en el orden en que se generaron los colegios."""
+        return [(nombre, datos["usuario"], datos["contrasena"]) for nombre, datos in self.colegios.items()]
+
+    def guardar_credenciales(self, ruta):
+        """Escribe el XLSX de credenciales (columnas Colegio, Usuario, Contraseña) que lee main.py."""
+        import pandas as pd
+
+        pd.DataFrame(self.credenciales(), columns=["Colegio", "Usuario", "Contraseña"]).to_excel(ruta, index=False)
+
+    def iniciar(self):
+        self._servidor = ThreadingHTTPServer((self.host, self.puerto), _crear_manejador(self))
+        self._servidor.daemon_threads = True
+        self.puerto = self._servidor.server_address[1]
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, name="servidor-mock", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._hilo.join()
+            self._servidor = None
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
+
+    def contar(self, ruta):
+        with self._lock:
+            self.peticiones[ruta] += 1
+
+    def esperar_latencia(self):
+        if self.latencia <= 0 and self.variacion <= 0:
+            return
+        with self._lock:
+            espera = self.latencia + self._azar.uniform(0, self.variacion)
+        time.sleep(espera)
+
+    def falla(self):
+        if self.tasa_fallos <= 0:
+            return False
+        with self._lock:
+            fallo = self._azar.random() < self.tasa_fallos
+            if fallo:
+                self.peticiones["fallos_inyectados"] += 1
+        return fallo
+
+    def resumen(self):
+        with self._lock:
+            return dict(self.peticiones)
+
+
+def _crear_manejador(servidor):
+    patron_estudiante = re.compile(r"^/students/([^/]+)$")
+    patron_cursos = re.compile(r"^/api/students/([^/]+)/courses$")
+
+    class Manejador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, formato, *args):
+            pass
+
+        def _responder(self, estado, cuerpo=b"", tipo="text/html; charset=utf-8", cabeceras=()):
+            if isinstance(cuerpo, str):
+                cuerpo = cuerpo.encode("utf-8")
+            self.send_response(estado)
+            self.send_header("Content-Type", tipo)
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.send_header("Cache-Control", "no-store")
+            for nombre, valor in cabeceras:
+                self.send_header(nombre, valor)
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def _json(self, datos, estado=200):
+            self._responder(estado, json.dumps(datos, ensure_ascii=False), "application/json; charset=utf-8")
+
+        def _redirigir(self, destino, cabeceras=()):
+            self._responder(302, cabeceras=[("Location", destino), *cabeceras])
+
+        def _colegio_sesion(self):
+            for parte in (self.headers.get("Cookie") or "").split(";"):
+                clave, _, valor = parte.strip().partition("=")
+                if clave == "sesion":
+                    with servidor._lock:
+                        return servidor.sesiones.get(valor)
+            return None
+
+        def do_GET(self):
+            ruta = urlparse(self.path)
+            servidor.esperar_latencia()
+            if ruta.path == "/login":
+                servidor.contar("login")
+                error = "<p>Usuario o contraseña incorrectos</p>" if "error" in parse_qs(ruta.query) else ""
+                return self._responder(200, PAGINA_LOGIN.format(error=error))
+
+            colegio = self._colegio_sesion()
+            api = ruta.path.startswith("/api/")
+            if colegio is None:
+                if api:
+                    return self._json({"error": "unauthorized"}, 401)
+                return self._redirigir("/login")
+
+            if ruta.path == "/":
+                servidor.contar("inicio")
+                return self._responder(200, PAGINA_INICIO.format(colegio=colegio))
+            if ruta.path == "/schoolinfo/students":
+                servidor.contar("lista")
+                return self._responder(200, PAGINA_LISTA)
+            if ruta.path == "/api/schoolinfo/students":
+                servidor.contar("api_lista")
+                estudiantes = servidor.colegios[colegio]["estudiantes"]
+                try:
+                    pagina = max(0, int(parse_qs(ruta.query).get("page", ["0"])[0]))
+                except ValueError:
+                    pagina = 0
+                inicio = pagina * servidor.por_pagina
+                return self._json({
+                    "page": pagina,
+                    "rowsPerPage": servidor.por_pagina,
+                    "total": len(estudiantes),
+                    "rows": [
+                        {"studentId": e["id"], "studentName": e["nombre"], "className": e["aula"]}
+                        for e in estudiantes[inicio:inicio + servidor.por_pagina]
+                    ]
+                })
+
+            coincidencia = patron_estudiante.match(ruta.path) or patron_cursos.match(ruta.path)
+            if coincidencia:
+                datos = servidor.estudiantes.get(coincidencia.group(1))
+                if datos is None or datos[0] != colegio:
+                    return self._responder(404, "No encontrado", "text/plain; charset=utf-8")
+                if servidor.falla():
+                    return self._responder(500, "Error interno", "text/plain; charset=utf-8")
+                estudiante = datos[1]
+                if api:
+                    servidor.contar("api_cursos")
+                    return self._json({
+                        "studentId": estudiante["id"],
+                        "courses": [
+                            {"courseTitle": titulo, "completedChapters": completados, "totalChapters": total}
+                            for titulo, completados, total in estudiante["cursos"]
+                        ]
+                    })
+                servidor.contar("estudiante")
+                return self._responder(200, PAGINA_ESTUDIANTE.replace("{id_json}", json.dumps(estudiante["id"])))
+
+            self._responder(404, "No encontrado", "text/plain; charset=utf-8")
+
+        def do_POST(self):
+            ruta = urlparse(self.path)
+            servidor.esperar_latencia()
+            if ruta.path != "/login":
+                return self._responder(404, "No encontrado", "text/plain; charset=utf-8")
+            servidor.contar("login_post")
+            longitud = int(self.headers.get("Content-Length") or 0)
+            formulario = parse_qs(self.rfile.read(longitud).decode("utf-8"))
+            usuario = formulario.get("userId", [""])[0]
+            contrasena = formulario.get("userPassword", [""])[0]
+            for nombre, datos in servidor.colegios.items():
+                if datos["usuario"] == usuario and datos["contrasena"] == contrasena:
+                    token = secrets.token_hex(16)
+                    with servidor._lock:
+                        servidor.sesiones[token] = nombre
+                    destino = "/schoolinfo/students" if nombre in servidor.lista_directa else "/"
+                    return self._redirigir(destino, [("Set-Cookie", f"sesion={token}; Path=/; HttpOnly")])
+            self._redirigir("/login?error=1")
+
+    return Manejador
+
+
+def main_servidor(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--colegios", type=int, default=3)
+    parser.add_argument("--estudiantes", type=int, default=50, help="Estudiantes por colegio.")
+    parser.add_argument("--por-pagina", type=int, default=10, help="Filas por página de la tabla de estudiantes.")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Segundos de espera por petición.")
+    parser.add_argument("--variacion", type=float, default=0.0, help="Segundos extra aleatorios (uniforme) por petición.")
+    parser.add_argument("--fallos", type=float, default=0.0, help="Probabilidad de error 500 en las páginas de estudiante.")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--credenciales", metavar="RUTA", help="Escribe el XLSX de credenciales de los colegios simulados.")
+    args = parser.parse_args(argv)
+
+    servidor = ServidorMock(
+        colegios=args.colegios, estudiantes=args.estudiantes, por_pagina=args.por_pagina, latencia=args.latencia,
+        variacion=args.variacion, tasa_fallos=args.fallos, semilla=args.semilla, puerto=args.puerto
+    )
+    if args.credenciales:
+        servidor.guardar_credenciales(args.credenciales)
+        print(f"Credenciales escritas en {args.credenciales}")
+    servidor.iniciar()
+    print(f"Servidor simulado en {servidor.url} ({args.colegios} colegios, {servidor.total_estudiantes} estudiantes)")
+    for colegio, usuario, contrasena in servidor.credenciales():
+        print(f"  {colegio}: {usuario} / {contrasena}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.detener()
+
+
+if __name__ == "__main__":
+    main_servidor()
@@ -0,0 +1,48 @@
+"""Dibujo de los gráficos del reporte a partir de sus datos agregados.
+
+Solo depende de matplotlib y numpy, para que los procesos que dibujan en paralelo (main.renderizar_en_procesos)
+arranquen sin cargar pandas, Playwright ni el resto de main.py. Como script lee de stdin una lista JSON de
+especificaciones, dibuja cada una y escribe en stdout la lista JSON de rutas generadas.
+"""
+import json
+import sys
+
+import numpy as np
+
+
+# Dibujo con la API orientada a objetos de matplotlib (sin estado global de pyplot)
+def renderizar_grafico(especificacion):
+    """Dibuja y guarda un gráfico descrito por un diccionario de datos agregados. Devuelve la ruta."""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    if especificacion["tipo"] == "aula":
+        fig = Figure(figsize=(10, 6))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        ax.bar(especificacion["aulas"], especificacion["valores"])
+        ax.set_title(especificacion["titulo"])
+        ax.set_xlabel("Aula")
+        ax.set_ylabel("Capítulos Completados (Promedio)")
+        ax.tick_params(axis="x", labelrotation=45)
+    else:
+        qureo, js = especificacion["qureo"], especificacion["js"]
+        fig = Figure(figsize=(12, 6))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        x = range(len(especificacion["colegios"]))
+        ax.bar([i - 0.2 for i in x], qureo, width=0.4, label="Qureo", color="blue")
+        ax.bar([i + 0.2 for i in x], js, width=0.4, label="Curso de JavaScript", color="purple")
+        ax.set_title("Avance Promedio por Colegio (Global)")
+        ax.set_xlabel("Colegio")
+        ax.set_ylabel("Capítulos Completados (Promedio)")
+        ax.set_xticks(list(x), especificacion["colegios"], rotation=90)
+        ax.set_yticks(np.arange(0, max(max(qureo, default=0), max(js, default=0)) + 1, 1))
+        ax.legend()
+    fig.tight_layout()
+    fig.savefig(especificacion["ruta"])
+    return especificacion["ruta"]
+
+
+if __name__ == "__main__":
+    json.dump([renderizar_grafico(e) for e in json.load(sys.stdin)], sys.stdout)
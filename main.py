@@ -1,57 +1,1648 @@
-import matplotlib
-matplotlib.use('Agg')  
-import tkinter as tk
-from tkinter import ttk, messagebox
+# tkinter, PIL y matplotlib se importan solo en los modos que los usan (GUI y gráficos),
+# para que el modo --headless arranque rápido en servidores sin pantalla
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 import pandas as pd
+import numpy as np
 import threading
-from PIL import Image, ImageTk
-from urllib.parse import urljoin
+import queue
+from collections import deque, Counter
+from urllib.parse import urljoin, urlparse
 import time
 import logging
+import logging.handlers
+import atexit
 import os
-import matplotlib.pyplot as plt  # Para generar gráficos
-import numpy as np  # Para manejar los ticks del eje y
+import sys
+import argparse
 import unicodedata  # Para normalizar acentos
 import re  # Para sanitizar nombres de hojas
-
-# Configurar logging para depuración detallada
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+import json
+import sqlite3
+import hashlib
+import heapq
+from graficos import renderizar_grafico
+from array import array
+import subprocess
+import socket
+import socketserver
+import secrets
+import hmac
+from contextlib import contextmanager
+
+# Configurar logging: los hilos solo encolan los registros y un hilo de fondo los escribe, para que la extracción
+# no espere a la E/S del log. El detalle por curso y estudiante va en DEBUG (QUREO_LOG_NIVEL=DEBUG para verlo).
+_cola_log = queue.SimpleQueue()
+_manejador_log = logging.StreamHandler()
+_manejador_log.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+_oyente_log = logging.handlers.QueueListener(_cola_log, _manejador_log)
+_oyente_log.start()
+atexit.register(_oyente_log.stop)
+# El QueueHandler deja el mensaje sin formato: el formato completo lo aplica una sola vez _manejador_log
+_encolador_log = logging.handlers.QueueHandler(_cola_log)
+_encolador_log.setFormatter(logging.Formatter('%(message)s'))
+logging.basicConfig(level=os.environ.get("QUREO_LOG_NIVEL", "INFO").upper(), handlers=[_encolador_log])
 logger = logging.getLogger(__name__)
 
+def _lista_entorno(variable, por_defecto):
+    """Lee una lista separada por comas desde una variable de entorno."""
+    return [v.strip().lower() for v in os.environ.get(variable, por_defecto).split(",") if v.strip()]
+
+# URL de la plataforma; QUREO_BASE_URL permite apuntar a otro servidor (p. ej. benchmarks/servidor_mock.py)
+BASE_URL = os.environ.get("QUREO_BASE_URL", "https://sa-admin.qureo.education").rstrip("/")
+
+# Número máximo de colegios que se procesan a la vez (cada uno en su propio contexto de navegador)
+MAX_COLEGIOS_CONCURRENTES = max(1, int(os.environ.get("QUREO_COLEGIOS_CONCURRENTES", "3")))
+
+# Número de páginas de estudiantes que se cargan a la vez dentro de cada colegio
+TAMANO_POOL_PAGINAS = max(1, int(os.environ.get("QUREO_PAGINAS_POR_COLEGIO", "4")))
+
+# Modo de extracción: "dom" expande los acordeones; "red" lee las respuestas JSON que ya carga la página
+# (el DOM se usa como respaldo cuando la red no trae los datos)
+MODO_EXTRACCION = os.environ.get("QUREO_MODO_EXTRACCION", "dom").strip().lower()
+
+# Claves y URLs reconocidas en las respuestas JSON del modo "red"
+PATRON_URL_CURSOS = re.compile(r"course|progress|chapter|student", re.IGNORECASE)
+PATRON_URL_ESTUDIANTES = re.compile(r"student", re.IGNORECASE)
+CLAVES_TITULO_CURSO = ["courseTitle", "courseName", "title", "name"]
+CLAVES_CAPITULOS_COMPLETADOS = ["completedChapters", "finishedChapters", "completedChapterCount", "completed", "finished"]
+CLAVES_TOTAL_CAPITULOS = ["totalChapters", "chapterCount", "totalChapterCount", "total"]
+CLAVES_LISTA_CAPITULOS = ["chapters", "chapterList"]
+CLAVES_CAPITULO_FINALIZADO = ["completed", "finished", "isCompleted", "isFinished"]
+CLAVES_ID_ESTUDIANTE = ["studentId", "id", "_id"]
+CLAVES_NOMBRE_ESTUDIANTE = ["studentName", "fullName", "name"]
+CLAVES_AULA = ["className", "classroomName", "classroom", "class"]
+
+# Bloqueo de recursos por página: tipos de recurso (por extensión de la URL) y hosts (incluye subdominios).
+# Se bloquean con Network.setBlockedURLs de Chromium para no enrutar las peticiones, porque el enrutamiento de
+# Playwright desactiva la caché HTTP y cada página volvería a descargar el JS y el CSS de la aplicación.
+# Si QUREO_HOSTS_PERMITIDOS tiene valores, solo se permiten esos hosts; eso exige enrutar (sin caché HTTP).
+BLOQUEAR_RECURSOS = os.environ.get("QUREO_BLOQUEAR_RECURSOS", "1") != "0"
+TIPOS_RECURSO_BLOQUEADOS = _lista_entorno("QUREO_TIPOS_BLOQUEADOS", "image,font,media")
+HOSTS_BLOQUEADOS = _lista_entorno(
+    "QUREO_HOSTS_BLOQUEADOS",
+    "google-analytics.com,googletagmanager.com,doubleclick.net,facebook.net,facebook.com,"
+    "hotjar.com,clarity.ms,segment.io,mixpanel.com,intercom.io,sentry.io"
+)
+EXTENSIONES_POR_TIPO = {
+    "image": ["png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp"],
+    "font": ["woff", "woff2", "ttf", "otf", "eot"],
+    "media": ["mp4", "webm", "ogg", "mp3", "wav", "m4a", "mov"],
+}
+HOSTS_PERMITIDOS = _lista_entorno("QUREO_HOSTS_PERMITIDOS", "")
+
+# Caché de sesiones (storage state de Playwright) para no repetir el login en cada ejecución
+CACHE_SESIONES = os.environ.get("QUREO_CACHE_SESIONES", "1") != "0"
+DIRECTORIO_SESIONES = os.environ.get("QUREO_DIR_SESIONES", "sesiones")
+SESION_MAX_HORAS = float(os.environ.get("QUREO_SESION_MAX_HORAS", "12"))
+
+# Almacén SQLite con las filas de cada ejecución; con QUREO_REANUDAR=1 se continúa la última ejecución interrumpida
+RUTA_ALMACEN = os.environ.get("QUREO_ALMACEN", "resultados.db")
+REANUDAR = os.environ.get("QUREO_REANUDAR", "0") == "1"
+
+# Detección de cambios (QUREO_INCREMENTAL=1 o --incremental): solo se abren las páginas de los estudiantes cuya fila en
+# la lista cambió desde la última ejecución completa del colegio; los demás copian sus cursos de esa ejecución.
+# Como la lista no siempre muestra el progreso, un estudiante se copia como máximo QUREO_MAX_COPIAS veces seguidas.
+INCREMENTAL = os.environ.get("QUREO_INCREMENTAL", "0") == "1"
+MAX_COPIAS_SIN_VISITA = int(os.environ.get("QUREO_MAX_COPIAS", "3"))
+
+# Ejecuciones por shards (--shard i/N o --procesos N): cada shard guarda sus colegios en un almacén parcial
+PLANTILLA_PARCIAL = "parcial_{i}_de_{n}.db"
+# Asignación de colegios a shards compartida por todas las máquinas (--asignar N la escribe, --shard la lee)
+ARCHIVO_ASIGNACION = "asignacion_shards.json"
+
+# Daemon de navegadores (--daemon): mantiene Playwright y Chromium abiertos y recibe trabajos por un socket local.
+# Escribe su puerto y token en QUREO_DAEMON_ARCHIVO; con QUREO_DAEMON=1 (o --usar-daemon) las ejecuciones lo usan
+# si responde y, si no, lanzan su propio navegador. Se apaga tras QUREO_DAEMON_INACTIVIDAD segundos sin trabajos.
+USAR_DAEMON = os.environ.get("QUREO_DAEMON", "0") == "1"
+ARCHIVO_DAEMON = os.environ.get("QUREO_DAEMON_ARCHIVO", ".qureo_daemon.json")
+PUERTO_DAEMON = int(os.environ.get("QUREO_DAEMON_PUERTO", "0"))
+INACTIVIDAD_DAEMON = float(os.environ.get("QUREO_DAEMON_INACTIVIDAD", "1800"))
+
+# Historial de progreso por ejecución; el Avance se calcula contra la ejecución anterior o contra QUREO_COMPARAR_DESDE (AAAA-MM-DD)
+RUTA_HISTORIAL = os.environ.get("QUREO_HISTORIAL", "historial_avances.db")
+COMPARAR_DESDE = os.environ.get("QUREO_COMPARAR_DESDE") or None
+
+# Gráficos: procesos para dibujarlos y archivo con los hashes de sus datos (dentro de la carpeta de gráficos).
+# Cada proceso dibuja al menos QUREO_MIN_GRAFICOS_POR_PROCESO gráficos; con menos pendientes se dibujan aquí mismo,
+# porque arrancar un intérprete con matplotlib cuesta más que dibujar unos pocos
+MAX_PROCESOS_GRAFICOS = max(1, int(os.environ.get("QUREO_PROCESOS_GRAFICOS", str(os.cpu_count() or 1))))
+MIN_GRAFICOS_POR_PROCESO = max(1, int(os.environ.get("QUREO_MIN_GRAFICOS_POR_PROCESO", "8")))
+ARCHIVO_CACHE_GRAFICOS = ".cache_graficos.json"
+
+# Timeouts adaptativos por colegio: percentil de la latencia observada × factor, acotado entre un mínimo y un máximo.
+# Hasta reunir MUESTRAS_MIN_TIMEOUT mediciones de una espera se usa su valor inicial.
+PERCENTIL_TIMEOUT = float(os.environ.get("QUREO_PERCENTIL_TIMEOUT", "95"))
+FACTOR_TIMEOUT = float(os.environ.get("QUREO_FACTOR_TIMEOUT", "4"))
+TIMEOUT_MIN_MS = int(os.environ.get("QUREO_TIMEOUT_MIN_MS", "2000"))
+TIMEOUT_MAX_MS = int(os.environ.get("QUREO_TIMEOUT_MAX_MS", "60000"))
+MUESTRAS_MIN_TIMEOUT = 5
+
+# Reintentos diferidos de estudiantes (al final del colegio, con espera exponencial) y circuito por colegio:
+# tras QUREO_FALLOS_CONSECUTIVOS fallos seguidos se vuelve a iniciar sesión una vez y, si sigue fallando, se aborta.
+# QUREO_REINTENTOS=1 mantiene los 2 intentos por estudiante de siempre
+MAX_REINTENTOS_ESTUDIANTE = max(0, int(os.environ.get("QUREO_REINTENTOS", "1")))
+ESPERA_MAX_REINTENTO = float(os.environ.get("QUREO_ESPERA_MAX_REINTENTO", "30"))
+UMBRAL_CIRCUITO = max(1, int(os.environ.get("QUREO_FALLOS_CONSECUTIVOS", "5")))
+MAX_REAUTENTICACIONES = max(0, int(os.environ.get("QUREO_REAUTENTICACIONES", "1")))
+TIMEOUTS_INICIALES_MS = {
+    "goto": 12000,
+    "carga_pagina": 12000,
+    "espera_acordeones": 8000,
+    "expandir_curso": 4000,
+    "espera_expansion": 4000,
+    "cambio_pagina": 15000
+}
+
+# Frecuencia con la que la GUI (ms) y el modo --headless (s) leen el canal de eventos de progreso
+INTERVALO_EVENTOS_GUI_MS = max(16, int(os.environ.get("QUREO_INTERVALO_EVENTOS_MS", "100")))
+INTERVALO_EVENTOS_CLI = float(os.environ.get("QUREO_INTERVALO_EVENTOS_CLI", "2"))
+
+# Métricas de tiempo por fase al final de cada ejecución (.json, o .prom/.txt para Prometheus); vacío para no exportarlas
+RUTA_METRICAS = os.environ.get("QUREO_METRICAS", "metricas_ejecucion.json")
+TOP_LENTOS = int(os.environ.get("QUREO_TOP_LENTOS", "10"))
+
+# Taxonomía de cursos: plataforma del reporte, patrones (regex sobre el título sin acentos y en mayúsculas) y
+# título con el que se registra el curso si el estudiante no lo tiene. QUREO_TAXONOMIA puede apuntar a un JSON
+# con la misma estructura: [{"plataforma": ..., "patrones": [...], "titulo_por_defecto": ...}, ...]
+TAXONOMIA_CURSOS = [
+    {"plataforma": "Qureo", "patrones": ["PRINCIPIANTE", "BEGINNER", "BASICO", "INTRO"], "titulo_por_defecto": "Curso para principiantes"},
+    {"plataforma": "Curso de JavaScript", "patrones": ["JAVASCRIPT", r"\bJS\b"], "titulo_por_defecto": "Curso de JavaScript"}
+]
+RUTA_TAXONOMIA = os.environ.get("QUREO_TAXONOMIA") or None
+
+# Enlaces a la lista de estudiantes en la página de inicio, en orden de preferencia
+SELECTORES_ENLACE_ESTUDIANTES = ["a[href='/schoolinfo/students']", "a:has-text('Estudiantes')", "a:has-text('Students')"]
+
+# Colegios cuya lista de estudiantes se muestra directamente tras el login
+COLEGIOS_ESPECIALES = [
+    "CARLOS PHILLIPS",
+    "19 DE JUNIO",
+    "8 DE DICIEMBRE",
+    "JOSÉ BAQUIJANO Y CARRILLO"
+]
+
+GRUPO_MAPPING = {
+    "CARLOS PHILLIPS": "GRUPO 1",
+    "JOSÉ BAQUIJANO Y CARRILLO": "GRUPO 2",
+    "19 DE JUNIO": "GRUPO 3",
+    "8 DE DICIEMBRE": "GRUPO 4"
+}
+
+def normalizar_texto(texto):
+    """Normaliza texto eliminando acentos y convirtiendo a mayúsculas."""
+    texto = ''.join(c for c in unicodedata.normalize('NFKD', texto) if unicodedata.category(c) != 'Mn')
+    return texto.strip().upper()
+
+# Clasificación de títulos de curso en plataformas, compartida por la extracción y el reporte
+class TaxonomiaCursos:
+    """Asigna a cada título de curso su plataforma (o None si no se reporta) con patrones precompilados sobre
+    el título normalizado. Las reglas se evalúan en orden y el resultado de cada título se memoriza."""
+
+    def __init__(self, reglas):
+        self.reglas = [
+            (regla["plataforma"], re.compile("|".join(f"(?:{p})" for p in regla["patrones"]), re.IGNORECASE))
+            for regla in reglas
+        ]
+        self.titulos_por_defecto = [regla["titulo_por_defecto"] for regla in reglas if regla.get("titulo_por_defecto")]
+        self._cache = {}
+
+    @classmethod
+    def cargar(cls, ruta=None):
+        """Taxonomía del JSON `ruta` o, sin ruta, la de TAXONOMIA_CURSOS."""
+        if ruta is None:
+            return cls(TAXONOMIA_CURSOS)
+        with open(ruta, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def plataforma(self, titulo):
+        try:
+            return self._cache[titulo]
+        except KeyError:
+            pass
+        normalizado = normalizar_texto(str(titulo))
+        resultado = next((plataforma for plataforma, patron in self.reglas if patron.search(normalizado)), None)
+        self._cache[titulo] = resultado
+        return resultado
+
+    def relevante(self, titulo):
+        return self.plataforma(titulo) is not None
+
+# Política de bloqueo: descarta recursos que no hacen falta para leer los datos
+class PoliticaRecursos:
+    """Bloquea en cada página las peticiones de tipos o hosts bloqueados y cuenta lo bloqueado.
+
+    Sin hosts permitidos se usa Network.setBlockedURLs en una sesión CDP por página (aplicar_pagina), que
+    conserva la caché HTTP; con hosts permitidos se enruta el contexto entero (aplicar) y se pierde la caché."""
+
+    def __init__(self, tipos_bloqueados, hosts_bloqueados, hosts_permitidos=None):
+        self.tipos_bloqueados = set(tipos_bloqueados)
+        self.hosts_bloqueados = list(hosts_bloqueados)
+        self.hosts_permitidos = list(hosts_permitidos or [])
+        self.bloqueados_por_tipo = Counter()
+        self.bloqueados_por_host = Counter()
+        self.permitidas = 0
+        self._lock = threading.Lock()
+        self.enrutar = bool(self.hosts_permitidos)
+        self.patrones = [
+            f"*.{extension}{sufijo}"
+            for tipo in sorted(self.tipos_bloqueados) for extension in EXTENSIONES_POR_TIPO.get(tipo, [])
+            for sufijo in ("", "?*")
+        ] + [patron for host in self.hosts_bloqueados for patron in (f"*://{host}/*", f"*://*.{host}/*")]
+
+    @staticmethod
+    def _coincide_host(host, hosts):
+        return any(host == h or host.endswith("." + h) for h in hosts)
+
+    def motivo_bloqueo(self, tipo, host):
+        """Devuelve "tipo" o "host" si la petición debe bloquearse, o None si se permite."""
+        if self.hosts_permitidos and not self._coincide_host(host, self.hosts_permitidos):
+            return "host"
+        if self._coincide_host(host, self.hosts_bloqueados):
+            return "host"
+        if tipo in self.tipos_bloqueados:
+            return "tipo"
+        return None
+
+    def aplicar(self, context):
+        """Enruta el contexto solo si hay hosts permitidos; si no, el bloqueo se aplica por página."""
+        if self.enrutar:
+            context.route("**/*", self._manejar)
+
+    def aplicar_pagina(self, page):
+        """Bloquea por patrón de URL en una página recién creada, antes de su primera navegación."""
+        if self.enrutar or not self.patrones:
+            return
+        sesion = page.context.new_cdp_session(page)
+        sesion.on("Network.loadingFailed", self._bloqueada)
+        sesion.send("Network.enable")
+        sesion.send("Network.setBlockedURLs", {"urls": self.patrones})
+
+    def _bloqueada(self, parametros):
+        # Chromium marca con blockedReason "inspector" las peticiones que coinciden con setBlockedURLs
+        if parametros.get("blockedReason") == "inspector":
+            with self._lock:
+                self.bloqueados_por_tipo[str(parametros.get("type", "other")).lower()] += 1
+
+    def _manejar(self, route):
+        request = route.request
+        host = urlparse(request.url).hostname or ""
+        motivo = self.motivo_bloqueo(request.resource_type, host)
+        with self._lock:
+            if motivo is None:
+                self.permitidas += 1
+            elif motivo == "tipo":
+                self.bloqueados_por_tipo[request.resource_type] += 1
+            else:
+                self.bloqueados_por_host[host] += 1
+        if motivo is None:
+            route.continue_()
+        else:
+            route.abort()
+
+    def resumen(self):
+        with self._lock:
+            total = sum(self.bloqueados_por_tipo.values()) + sum(self.bloqueados_por_host.values())
+            if not self.enrutar:
+                # Sin enrutamiento no se ven las peticiones permitidas, y los hosts bloqueados cuentan por su tipo
+                return f"{total} peticiones bloqueadas por patrón de URL. Por tipo: {dict(self.bloqueados_por_tipo)}"
+            return (f"{total} peticiones bloqueadas, {self.permitidas} permitidas. "
+                    f"Por tipo: {dict(self.bloqueados_por_tipo)}. Por host: {dict(self.bloqueados_por_host)}")
+
+
+# Caché de sesiones: reutiliza el storage state de Playwright entre ejecuciones
+class CacheSesiones:
+    """Guarda por colegio y usuario el storage state y la URL posterior al login."""
+
+    def __init__(self, directorio, max_horas):
+        self.directorio = directorio
+        self.max_segundos = max_horas * 3600
+
+    def ruta(self, colegio, usuario):
+        clave = hashlib.sha256(f"{colegio}|{usuario}".encode("utf-8")).hexdigest()[:24]
+        return os.path.join(self.directorio, f"sesion_{clave}.json")
+
+    def cargar(self, colegio, usuario):
+        """Devuelve {"url": ..., "estado": storage_state} si hay una sesión guardada y no caducada, o None."""
+        ruta = self.ruta(colegio, usuario)
+        try:
+            if time.time() - os.path.getmtime(ruta) > self.max_segundos:
+                return None
+            with open(ruta, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def guardar(self, context, url, colegio, usuario):
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta = self.ruta(colegio, usuario)
+        temporal = f"{ruta}.{threading.get_ident()}.tmp"
+        # El archivo contiene cookies de sesión: solo lectura para el usuario actual
+        with open(os.open(temporal, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8") as f:
+            json.dump({"url": url, "estado": context.storage_state()}, f)
+        os.replace(temporal, ruta)
+
+    def invalidar(self, colegio, usuario):
+        try:
+            os.remove(self.ruta(colegio, usuario))
+        except OSError:
+            pass
+
+
+# Almacén en disco de los resultados de cada ejecución, para reanudar una ejecución interrumpida
+class AlmacenResultados:
+    """Guarda en SQLite las filas de cada estudiante en cuanto se extraen, por ejecución, colegio y URL."""
+
+    COLUMNAS = ["Aula", "Grado", "Sección", "Estudiante", "Curso", "Capítulos finalizados"]
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        # Una sola conexión compartida por los hilos de trabajo, serializada con el lock
+        self.conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.execute("PRAGMA synchronous=NORMAL")
+        self.conexion.executescript("""
+            CREATE TABLE IF NOT EXISTS ejecuciones (
+                run_id TEXT PRIMARY KEY, inicio REAL NOT NULL, fin REAL
+            );
+            CREATE TABLE IF NOT EXISTS colegios (
+                run_id TEXT NOT NULL, colegio TEXT NOT NULL, posicion INTEGER NOT NULL,
+                completo INTEGER NOT NULL DEFAULT 0, error TEXT,
+                PRIMARY KEY (run_id, colegio)
+            );
+            CREATE TABLE IF NOT EXISTS estudiantes (
+                run_id TEXT NOT NULL, colegio TEXT NOT NULL, url TEXT NOT NULL, orden INTEGER NOT NULL,
+                nombre TEXT NOT NULL, omitido INTEGER NOT NULL, huella TEXT, copias INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (run_id, colegio, url)
+            );
+            CREATE TABLE IF NOT EXISTS shards (
+                run_id TEXT PRIMARY KEY, indice INTEGER NOT NULL, num_shards INTEGER NOT NULL, asignacion TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS filas (
+                run_id TEXT NOT NULL, colegio TEXT NOT NULL, url TEXT NOT NULL, posicion INTEGER NOT NULL,
+                aula TEXT, grado TEXT, seccion TEXT, estudiante TEXT, curso TEXT, capitulos TEXT,
+                PRIMARY KEY (run_id, colegio, url, posicion)
+            );
+        """)
+        # Almacenes creados antes de la detección de cambios
+        if "huella" not in {fila[1] for fila in self.conexion.execute("PRAGMA table_info(estudiantes)")}:
+            self.conexion.execute("ALTER TABLE estudiantes ADD COLUMN huella TEXT")
+            self.conexion.execute("ALTER TABLE estudiantes ADD COLUMN copias INTEGER NOT NULL DEFAULT 0")
+        self.conexion.commit()
+
+    def nueva_ejecucion(self):
+        run_id = time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}"
+        with self._lock, self.conexion:
+            self.conexion.execute("INSERT INTO ejecuciones (run_id, inicio) VALUES (?, ?)", (run_id, time.time()))
+        return run_id
+
+    def ultima_ejecucion_incompleta(self):
+        """La ejecución más reciente si quedó sin terminar, o None. Una ejecución interrumpida a la que le siguió
+        otra terminada ya no se reanuda: sus filas son más antiguas que las del último reporte."""
+        with self._lock:
+            fila = self.conexion.execute(
+                "SELECT run_id, fin FROM ejecuciones ORDER BY inicio DESC LIMIT 1"
+            ).fetchone()
+        return fila[0] if fila and fila[1] is None else None
+
+    def ultima_ejecucion(self):
+        """La ejecución más reciente, terminada o no (la que dejó un shard en su almacén parcial)."""
+        with self._lock:
+            fila = self.conexion.execute("SELECT run_id FROM ejecuciones ORDER BY inicio DESC LIMIT 1").fetchone()
+        return fila[0] if fila else None
+
+    def finalizar_ejecucion(self, run_id):
+        with self._lock, self.conexion:
+            self.conexion.execute("UPDATE ejecuciones SET fin = ? WHERE run_id = ?", (time.time(), run_id))
+
+    def guardar_estudiante(self, run_id, colegio, url, orden, nombre, filas, omitido, huella=None, copias=0):
+        """Reemplaza de forma atómica las filas guardadas de un estudiante. `huella` es la de su fila en la lista
+        y `copias` cuántas ejecuciones seguidas lleva copiado sin visitar su página."""
+        with self._lock, self.conexion:
+            self.conexion.execute("DELETE FROM filas WHERE run_id = ? AND colegio = ? AND url = ?", (run_id, colegio, url))
+            self.conexion.execute(
+                "INSERT OR REPLACE INTO estudiantes (run_id, colegio, url, orden, nombre, omitido, huella, copias)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, colegio, url, orden, nombre, int(omitido), huella, copias)
+            )
+            self.conexion.executemany(
+                "INSERT INTO filas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, colegio, url, posicion, *fila) for posicion, fila in enumerate(filas)]
+            )
+
+    def estudiantes_guardados(self, run_id, colegio):
+        """Devuelve {url: filas} (tuplas en el orden de COLUMNAS) de los estudiantes ya capturados, sin los
+        omitidos, que se vuelven a intentar."""
+        with self._lock:
+            cursor = self.conexion.execute(
+                "SELECT f.url, f.aula, f.grado, f.seccion, f.estudiante, f.curso, f.capitulos"
+                " FROM filas f JOIN estudiantes e USING (run_id, colegio, url)"
+                " WHERE f.run_id = ? AND f.colegio = ? AND e.omitido = 0 ORDER BY f.url, f.posicion",
+                (run_id, colegio)
+            )
+            guardados = {}
+            for url, *valores in cursor:
+                guardados.setdefault(url, []).append(tuple(valores))
+        return guardados
+
+    def huellas_anteriores(self, run_id, colegio):
+        """Devuelve {url: (huella, copias, filas)} de la última ejecución, distinta de `run_id`, en la que el
+        colegio terminó sin error. Solo incluye los estudiantes capturados con huella."""
+        with self._lock:
+            fila = self.conexion.execute(
+                "SELECT c.run_id FROM colegios c JOIN ejecuciones e USING (run_id)"
+                " WHERE c.colegio = ? AND c.completo = 1 AND c.run_id != ? ORDER BY e.inicio DESC LIMIT 1",
+                (colegio, run_id)
+            ).fetchone()
+            if fila is None:
+                return {}
+            cursor = self.conexion.execute(
+                "SELECT e.url, e.huella, e.copias, f.aula, f.grado, f.seccion, f.estudiante, f.curso, f.capitulos"
+                " FROM estudiantes e JOIN filas f USING (run_id, colegio, url)"
+                " WHERE e.run_id = ? AND e.colegio = ? AND e.omitido = 0 AND e.huella IS NOT NULL ORDER BY e.url, f.posicion",
+                (fila[0], colegio)
+            )
+            anteriores = {}
+            for url, huella, copias, *valores in cursor:
+                anteriores.setdefault(url, (huella, copias, []))[2].append(tuple(valores))
+        return anteriores
+
+    def marcar_colegio(self, run_id, colegio, posicion, error=None):
+        with self._lock, self.conexion:
+            self.conexion.execute(
+                "INSERT OR REPLACE INTO colegios (run_id, colegio, posicion, completo, error) VALUES (?, ?, ?, ?, ?)",
+                (run_id, colegio, posicion, int(error is None), error)
+            )
+
+    def guardar_shard(self, run_id, indice, num_shards, asignacion):
+        """Registra qué shard (1..num_shards) guardó la ejecución y la asignación {colegio: shard} que usó."""
+        with self._lock, self.conexion:
+            self.conexion.execute(
+                "INSERT OR REPLACE INTO shards (run_id, indice, num_shards, asignacion) VALUES (?, ?, ?, ?)",
+                (run_id, indice, num_shards, json.dumps(asignacion, sort_keys=True, ensure_ascii=False))
+            )
+
+    def shard(self, run_id):
+        """(indice, num_shards, asignacion) registrados por guardar_shard, o None."""
+        with self._lock:
+            fila = self.conexion.execute(
+                "SELECT indice, num_shards, asignacion FROM shards WHERE run_id = ?", (run_id,)
+            ).fetchone()
+        return (fila[0], fila[1], json.loads(fila[2])) if fila else None
+
+    def errores_colegios(self, run_id):
+        """{colegio: error} de los colegios que terminaron con error en la ejecución."""
+        with self._lock:
+            return dict(self.conexion.execute(
+                "SELECT colegio, error FROM colegios WHERE run_id = ? AND completo = 0", (run_id,)
+            ).fetchall())
+
+    def colegios_completos(self, run_id):
+        with self._lock:
+            return {fila[0] for fila in self.conexion.execute(
+                "SELECT colegio FROM colegios WHERE run_id = ? AND completo = 1", (run_id,)
+            )}
+
+    def resultado_colegio(self, run_id, colegio):
+        """Reconstruye (df_datos, estudiantes_omitidos) de un colegio en el orden en que se listaron los estudiantes."""
+        acumulador = AcumuladorFilas()
+        with self._lock:
+            cursor = self.conexion.execute(
+                "SELECT e.orden, f.aula, f.grado, f.seccion, f.estudiante, f.curso, f.capitulos"
+                " FROM filas f JOIN estudiantes e USING (run_id, colegio, url)"
+                " WHERE f.run_id = ? AND f.colegio = ? ORDER BY e.orden, f.posicion",
+                (run_id, colegio)
+            )
+            for orden, *fila in cursor:
+                acumulador.agregar(orden, (fila,))
+            omitidos = [fila[0] for fila in self.conexion.execute(
+                "SELECT nombre FROM estudiantes WHERE run_id = ? AND colegio = ? AND omitido = 1 ORDER BY orden",
+                (run_id, colegio)
+            )]
+        return acumulador.a_dataframe(), omitidos
+
+    def cerrar(self):
+        with self._lock:
+            self.conexion.close()
+
+
+def fecha_a_ts(texto, fin_del_dia=False):
+    """Convierte 'AAAA-MM-DD' (hora local) en timestamp; con fin_del_dia incluye todo ese día."""
+    ts = time.mktime(time.strptime(texto, "%Y-%m-%d"))
+    return ts + 86400 if fin_del_dia else ts
+
+# Historial indexado del progreso de cada ejecución, para comparar sin releer reportes en Excel
+class HistorialAvances:
+    """Guarda en SQLite el progreso numérico por colegio, aula, estudiante, curso y fecha de ejecución."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self.conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.executescript("""
+            CREATE TABLE IF NOT EXISTS avances (
+                colegio TEXT NOT NULL, aula TEXT, grado TEXT, seccion TEXT, estudiante TEXT, curso TEXT,
+                completados INTEGER NOT NULL, total INTEGER NOT NULL, ts REAL NOT NULL, run_id TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_avances_clave ON avances (colegio, aula, estudiante, curso, ts);
+            CREATE INDEX IF NOT EXISTS idx_avances_ejecucion ON avances (colegio, ts, run_id);
+        """)
+        self.conexion.commit()
+
+    def registrar(self, colegio, run_id, ts, df_preparado):
+        """Guarda la instantánea de un colegio; si la ejecución ya la había guardado, la reemplaza."""
+        filas = zip(
+            df_preparado["Aula"].astype(str), df_preparado["Grado"].astype(str), df_preparado["Sección"].astype(str),
+            df_preparado["Estudiante"].astype(str), df_preparado["Curso"].astype(str),
+            df_preparado["Capítulos completados"].astype(int).tolist(), df_preparado["Total capítulos"].astype(int).tolist()
+        )
+        with self._lock, self.conexion:
+            self.conexion.execute("DELETE FROM avances WHERE colegio = ? AND run_id = ?", (colegio, run_id))
+            self.conexion.executemany(
+                "INSERT INTO avances VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(colegio, *fila, ts, run_id) for fila in filas]
+            )
+
+    def instantanea(self, colegio, excluir_run_id=None, hasta_ts=None):
+        """Devuelve la última instantánea del colegio (opcionalmente hasta una fecha) con las columnas
+        COLUMNAS_CLAVE + ["Capítulos completados_prev", "Total capítulos_prev"], o None si no hay ninguna."""
+        condiciones, parametros = ["colegio = ?"], [colegio]
+        if excluir_run_id is not None:
+            condiciones.append("run_id != ?")
+            parametros.append(excluir_run_id)
+        if hasta_ts is not None:
+            condiciones.append("ts <= ?")
+            parametros.append(hasta_ts)
+        with self._lock:
+            fila = self.conexion.execute(
+                f"SELECT ts FROM avances WHERE {' AND '.join(condiciones)} ORDER BY ts DESC LIMIT 1", parametros
+            ).fetchone()
+            if fila is None:
+                return None
+            filas = self.conexion.execute(
+                "SELECT aula, grado, seccion, estudiante, curso, completados, total FROM avances WHERE colegio = ? AND ts = ?",
+                (colegio, fila[0])
+            ).fetchall()
+        return pd.DataFrame(filas, columns=COLUMNAS_CLAVE + ["Capítulos completados_prev", "Total capítulos_prev"])
+
+    def estudiantes_por_colegio(self):
+        """{colegio: estudiantes} de la última instantánea de cada colegio, para repartir los shards."""
+        with self._lock:
+            filas = self.conexion.execute(
+                "SELECT a.colegio, COUNT(DISTINCT a.estudiante) FROM avances a"
+                " WHERE a.ts = (SELECT MAX(b.ts) FROM avances b WHERE b.colegio = a.colegio) GROUP BY a.colegio"
+            ).fetchall()
+        return {str(colegio): n for colegio, n in filas}
+
+    def tendencia(self, colegio=None, desde_ts=None):
+        """Promedio de capítulos completados por colegio, curso y ejecución, en orden cronológico."""
+        condiciones, parametros = ["1 = 1"], []
+        if colegio is not None:
+            condiciones.append("colegio = ?")
+            parametros.append(colegio)
+        if desde_ts is not None:
+            condiciones.append("ts >= ?")
+            parametros.append(desde_ts)
+        with self._lock:
+            filas = self.conexion.execute(
+                "SELECT colegio, curso, ts, COUNT(*), AVG(completados), MAX(total) FROM avances"
+                f" WHERE {' AND '.join(condiciones)} GROUP BY colegio, curso, ts ORDER BY colegio, curso, ts",
+                parametros
+            ).fetchall()
+        df = pd.DataFrame(filas, columns=["Colegio", "Curso", "ts", "Estudiantes", "Avance_Promedio", "Total_Capítulos"])
+        df.insert(2, "Fecha", [time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts)) for ts in df.pop("ts")])
+        return df
+
+    def cerrar(self):
+        with self._lock:
+            self.conexion.close()
+
+
+def asignar_shards(colegios, num_shards, pesos=None):
+    """Reparte los colegios en `num_shards` grupos equilibrados por `pesos` ({colegio: estudiantes de la
+    ejecución anterior}; los colegios sin peso usan la mediana). Se asigna de mayor a menor peso al shard
+    con menos carga, y los empates se ordenan por un hash estable del nombre, así que todo proceso con los
+    mismos pesos calcula la misma asignación. Devuelve {colegio: shard} con shards desde 0."""
+    pesos = {str(colegio): peso for colegio, peso in (pesos or {}).items()}
+    conocidos = sorted(pesos[str(c)] for c in colegios if str(c) in pesos)
+    por_defecto = conocidos[len(conocidos) // 2] if conocidos else 1
+
+    def hash_estable(colegio):
+        return int(hashlib.sha256(str(colegio).encode("utf-8")).hexdigest()[:16], 16)
+
+    cargas = [0] * num_shards
+    asignacion = {}
+    for colegio in sorted(set(colegios), key=lambda c: (-pesos.get(str(c), por_defecto), hash_estable(c))):
+        shard = min(range(num_shards), key=lambda s: (cargas[s], s))
+        asignacion[colegio] = shard
+        cargas[shard] += max(1, pesos.get(str(colegio), por_defecto))
+    return asignacion
+
+def leer_asignacion(ruta, colegios, num_shards):
+    """Lee el archivo de asignación ({"num_shards": N, "colegios": {colegio: shard desde 0}}) y comprueba que
+    sea de `num_shards` shards y cubra todos los colegios. Devuelve {colegio: shard} con claves de texto."""
+    with open(ruta, encoding="utf-8") as f:
+        datos = json.load(f)
+    if datos.get("num_shards") != num_shards:
+        raise Exception(f"{ruta} es una asignación de {datos.get('num_shards')} shards, no de {num_shards}")
+    asignacion = {str(colegio): shard for colegio, shard in datos.get("colegios", {}).items()}
+    faltantes = [str(colegio) for colegio in colegios if str(colegio) not in asignacion]
+    if faltantes:
+        raise Exception(f"{ruta} no asigna {len(faltantes)} colegio(s) de las credenciales: {faltantes[:10]}")
+    return asignacion
+
+
+def validar_parciales(colegios, shards):
+    """Comprueba que los parciales combinados sean de la misma asignación, que estén todos sus shards y que
+    asignen todos los colegios de las credenciales. `shards` es [(ruta, (indice, num_shards, asignacion) o None)].
+    Lanza una excepción con todos los problemas en lugar de generar un reporte incompleto."""
+    problemas = [f"{ruta} no registra su shard (parcial de una versión anterior)" for ruta, datos in shards if datos is None]
+    registrados = [(ruta, datos) for ruta, datos in shards if datos is not None]
+    if registrados:
+        _, (_, num_shards, asignacion) = registrados[0]
+        for ruta, (_, otro_num, otra_asignacion) in registrados[1:]:
+            if otro_num != num_shards or otra_asignacion != asignacion:
+                problemas.append(f"{ruta} usó otra asignación que {registrados[0][0]}")
+        indices = sorted(indice for _, (indice, _, _) in registrados)
+        faltan = sorted(set(range(1, num_shards + 1)) - set(indices))
+        if faltan:
+            problemas.append(f"faltan los parciales de los shards {faltan} de {num_shards}")
+        if len(indices) != len(set(indices)):
+            problemas.append(f"hay shards repetidos entre los parciales: {indices}")
+        sin_asignar = [str(colegio) for _, colegio, _, _ in colegios if str(colegio) not in asignacion]
+        if sin_asignar:
+            problemas.append(f"la asignación no incluye {len(sin_asignar)} colegio(s): {sin_asignar[:10]}")
+    elif not shards:
+        problemas.append("no se encontró ningún archivo parcial")
+    if problemas:
+        raise Exception("Los archivos parciales no se pueden combinar: " + "; ".join(problemas))
+
+
+def ruta_con_sufijo(ruta, sufijo):
+    """Inserta `sufijo` antes de la extensión de `ruta`."""
+    base, extension = os.path.splitext(ruta)
+    return f"{base}{sufijo}{extension}"
+
+
+# Extracción desde las respuestas de red (XHR/fetch) en lugar del DOM
+class CapturaRespuestas:
+    """Registra las respuestas JSON que carga una página para leer los datos sin expandir acordeones."""
+
+    def __init__(self, page):
+        self.respuestas = []
+        page.on("response", self._al_recibir)
+
+    def _al_recibir(self, response):
+        # Solo se guarda la referencia; el cuerpo se lee después, fuera del manejador del evento
+        if response.request.resource_type in ("xhr", "fetch") and "json" in (response.headers.get("content-type") or ""):
+            self.respuestas.append(response)
+
+    def reiniciar(self):
+        self.respuestas = []
+
+    def consumir(self, patron_url=None):
+        """Devuelve los cuerpos JSON capturados desde la última llamada cuya URL coincide con `patron_url`."""
+        respuestas, self.respuestas = self.respuestas, []
+        cuerpos = []
+        for response in respuestas:
+            if patron_url is not None and not patron_url.search(response.url):
+                continue
+            try:
+                cuerpos.append(response.json())
+            except Exception as e:
+                logger.debug(f"Respuesta JSON ilegible {response.url}: {str(e)}")
+        return cuerpos
+
+
+def recorrer_json(valor):
+    """Genera los diccionarios de un cuerpo JSON en orden de aparición."""
+    pila = [valor]
+    while pila:
+        actual = pila.pop()
+        if isinstance(actual, dict):
+            yield actual
+            pila.extend(reversed(list(actual.values())))
+        elif isinstance(actual, list):
+            pila.extend(reversed(actual))
+
+
+def _primer_valor(diccionario, claves, tipo):
+    for clave in claves:
+        valor = diccionario.get(clave)
+        if tipo is int:
+            if isinstance(valor, bool):
+                continue
+            if isinstance(valor, int):
+                return valor
+            if isinstance(valor, str) and valor.strip().isdigit():
+                return int(valor)
+        elif isinstance(valor, tipo) and valor:
+            return valor
+    return None
+
+
+def cursos_en_json(cuerpo):
+    """Extrae [(titulo, 'completados/total')] de un cuerpo JSON con el progreso de un estudiante."""
+    cursos = []
+    for objeto in recorrer_json(cuerpo):
+        titulo = _primer_valor(objeto, CLAVES_TITULO_CURSO, str)
+        if not titulo:
+            continue
+        completados = _primer_valor(objeto, CLAVES_CAPITULOS_COMPLETADOS, int)
+        total = _primer_valor(objeto, CLAVES_TOTAL_CAPITULOS, int)
+        if completados is None or total is None:
+            # Alternativa: lista de capítulos con una marca de finalizado en cada uno
+            capitulos = _primer_valor(objeto, CLAVES_LISTA_CAPITULOS, list)
+            if not capitulos or not all(isinstance(c, dict) for c in capitulos):
+                continue
+            total = len(capitulos)
+            completados = sum(1 for c in capitulos if any(c.get(clave) for clave in CLAVES_CAPITULO_FINALIZADO))
+        cursos.append((titulo.strip(), f"{completados}/{total}"))
+    return cursos
+
+
+def huella_fila(contenido):
+    """Huella corta de lo que la lista muestra de un estudiante: el texto de su fila o su objeto JSON."""
+    if not isinstance(contenido, str):
+        contenido = json.dumps(contenido, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(" ".join(contenido.split()).encode("utf-8")).hexdigest()[:16]
+
+
+def estudiantes_en_json(cuerpo):
+    """Extrae [(nombre_aula, nombre, href, huella)] de un cuerpo JSON con la lista de estudiantes. La huella
+    cubre todo el objeto del estudiante (última actividad o progreso agregado, si la API los incluye)."""
+    estudiantes = []
+    for objeto in recorrer_json(cuerpo):
+        id_estudiante = _primer_valor(objeto, CLAVES_ID_ESTUDIANTE, str) or _primer_valor(objeto, CLAVES_ID_ESTUDIANTE, int)
+        nombre = _primer_valor(objeto, CLAVES_NOMBRE_ESTUDIANTE, str)
+        if id_estudiante is None or not nombre:
+            continue
+        aula = None
+        for clave in CLAVES_AULA:
+            valor = objeto.get(clave)
+            if isinstance(valor, dict):
+                valor = _primer_valor(valor, ["name", "title"], str)
+            if isinstance(valor, str) and valor.strip():
+                aula = valor.strip()
+                break
+        # Sin aula ni claves propias de estudiante puede ser otro objeto con id y nombre (aula, curso, usuario)
+        if aula is None and "studentId" not in objeto and "studentName" not in objeto:
+            continue
+        estudiantes.append((aula or "Desconocida", nombre.strip(), f"/students/{id_estudiante}", huella_fila(objeto)))
+    return estudiantes
+
+
+# Scripts de extracción en lote: cada uno lee una página completa en una sola llamada a evaluate
+# Devuelve [texto, href, texto de la 2.ª celda de la fila, texto de toda la fila] por cada enlace de estudiante
+SCRIPT_LISTA_ESTUDIANTES = """
+() => Array.from(document.querySelectorAll("a[href*='/students/']")).map(a => {
+    const fila = a.closest("tr");
+    const celda = fila ? fila.querySelector("td:nth-child(2)") : null;
+    return [a.textContent, a.getAttribute("href"), celda ? celda.textContent : null, fila ? fila.textContent : a.textContent];
+})
+"""
+
+# Devuelve los href de los enlaces de estudiantes unidos, para detectar el cambio de página de la tabla
+SCRIPT_FIRMA_LISTA = """() => Array.from(document.querySelectorAll("a[href*='/students/']")).map(a => a.getAttribute("href")).join("|")"""
+
+# Devuelve [título h3, aria-expanded, visible, texto de progreso o null] por cada acordeón con h3
+SCRIPT_ACORDEONES = """
+() => Array.from(document.querySelectorAll("div[class*='MuiAccordionSummary-root']"))
+    .filter(resumen => resumen.querySelector("h3"))
+    .map(resumen => {
+        const rect = resumen.getBoundingClientRect();
+        const visible = rect.width > 0 && rect.height > 0 && getComputedStyle(resumen).visibility !== "hidden";
+        const contenedor = resumen.closest("div[class*='MuiAccordion-root']");
+        let progreso = null;
+        if (contenedor) {
+            for (const div of contenedor.querySelectorAll("div")) {
+                const texto = Array.from(div.childNodes).find(n => n.nodeType === Node.TEXT_NODE);
+                if (!texto || !(texto.data.includes("finalizados") || texto.data.includes("completed"))) continue;
+                let hermano = div.nextElementSibling;
+                while (hermano && hermano.tagName !== "DIV") hermano = hermano.nextElementSibling;
+                if (hermano) { progreso = hermano.textContent; break; }
+            }
+        }
+        return [resumen.querySelector("h3").textContent, resumen.getAttribute("aria-expanded"), visible, progreso];
+    })
+"""
+
+# Verdadero cuando los acordeones de los índices dados ya muestran su progreso (tras expandirlos)
+SCRIPT_PROGRESO_LISTO = f"""
+(indices) => {{
+    const acordeones = ({SCRIPT_ACORDEONES})();
+    return indices.every(i => i < acordeones.length && acordeones[i][3] !== null);
+}}
+"""
+
+
+# Pool de páginas reutilizables dentro de un contexto de navegador
+class PoolPaginas:
+    """Mantiene hasta `tamano` páginas abiertas en un contexto y las reutiliza entre estudiantes."""
+
+    def __init__(self, context, tamano, capturar_respuestas=False, politica_recursos=None):
+        self.context = context
+        self.tamano = max(1, tamano)
+        self.capturar_respuestas = capturar_respuestas
+        self.politica_recursos = politica_recursos
+        self.libres = []
+        self.creadas = 0
+        self.capturas = {}
+
+    def adquirir(self):
+        """Devuelve una página libre, crea una nueva si no se alcanzó el tamaño, o None si todas están ocupadas."""
+        if self.libres:
+            return self.libres.pop()
+        if self.creadas < self.tamano:
+            self.creadas += 1
+            pagina = self.context.new_page()
+            if self.politica_recursos is not None:
+                self.politica_recursos.aplicar_pagina(pagina)
+            if self.capturar_respuestas:
+                self.capturas[pagina] = CapturaRespuestas(pagina)
+            return pagina
+        return None
+
+    def captura(self, pagina):
+        """Captura de respuestas asociada a la página, o None si el pool no captura respuestas."""
+        return self.capturas.get(pagina)
+
+    def liberar(self, pagina):
+        """Devuelve la página al pool; si se cerró (p. ej. por un fallo de Chromium) se descarta."""
+        if pagina.is_closed():
+            self.creadas -= 1
+            self.capturas.pop(pagina, None)
+        else:
+            self.libres.append(pagina)
+
+    def cerrar(self):
+        for pagina in self.libres:
+            try:
+                pagina.close()
+            except Exception:
+                pass
+        self.libres = []
+        self.creadas = 0
+        self.capturas = {}
+
+# Circuito por colegio: detecta rachas de fallos (p. ej. la sesión caducó) sin esperar a agotar todos los estudiantes
+class CircuitoColegio:
+    """Cuenta los fallos consecutivos de estudiantes de un colegio. Cada reautenticación abre una nueva
+    generación: los resultados de navegaciones lanzadas antes de ella no cuentan para el circuito."""
+
+    def __init__(self, umbral, max_reautenticaciones=1):
+        self.umbral = umbral
+        self.max_reautenticaciones = max_reautenticaciones
+        self.consecutivos = 0
+        self.generacion = 0
+        self.reautenticaciones = 0
+
+    def exito(self, generacion):
+        if generacion == self.generacion:
+            self.consecutivos = 0
+
+    def fallo(self, generacion):
+        """Registra un fallo. Devuelve True si el circuito se abre."""
+        if generacion != self.generacion:
+            return False
+        self.consecutivos += 1
+        return self.consecutivos >= self.umbral
+
+    def puede_reautenticar(self):
+        return self.reautenticaciones < self.max_reautenticaciones
+
+    def reautenticado(self):
+        self.reautenticaciones += 1
+        self.generacion += 1
+        self.consecutivos = 0
+
+# Métricas de tiempo por fase: cada fase se acumula en total, por colegio y por estudiante
+class MetricasEjecucion:
+    """Duraciones por fase (login, paginación, goto, espera de acordeones, expansión de cursos, escritura
+    del Excel, gráficos) y reintentos de una ejecución. Seguro entre hilos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.inicio = time.time()
+        self.fases = {}  # fase -> {"llamadas", "segundos", "max"}
+        self.colegios = {}  # colegio -> {"segundos", "fases", "estudiantes", "reintentos"}
+        self.estudiantes = {}  # (colegio, estudiante) -> {"segundos", "fases", "reintentos"}
+
+    @contextmanager
+    def medir(self, fase, colegio=None, estudiante=None):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(fase, time.perf_counter() - inicio, colegio, estudiante)
+
+    def registrar(self, fase, segundos, colegio=None, estudiante=None):
+        with self._lock:
+            total = self.fases.setdefault(fase, {"llamadas": 0, "segundos": 0.0, "max": 0.0})
+            total["llamadas"] += 1
+            total["segundos"] += segundos
+            total["max"] = max(total["max"], segundos)
+            if colegio is None:
+                return
+            por_colegio = self._colegio(colegio)
+            por_colegio["fases"][fase] = por_colegio["fases"].get(fase, 0.0) + segundos
+            if estudiante is not None:
+                por_estudiante = self._estudiante(colegio, estudiante)
+                por_estudiante["segundos"] += segundos
+                por_estudiante["fases"][fase] = por_estudiante["fases"].get(fase, 0.0) + segundos
+
+    def colegio_terminado(self, colegio, segundos, estudiantes):
+        with self._lock:
+            por_colegio = self._colegio(colegio)
+            por_colegio["segundos"] = segundos
+            por_colegio["estudiantes"] = estudiantes
+
+    def reintento(self, colegio, estudiante):
+        with self._lock:
+            self._colegio(colegio)["reintentos"] += 1
+            self._estudiante(colegio, estudiante)["reintentos"] += 1
+
+    def estado(self):
+        """Fases, colegios y estudiantes medidos en un diccionario serializable en JSON (para el daemon)."""
+        with self._lock:
+            return {
+                "fases": {fase: dict(datos) for fase, datos in self.fases.items()},
+                "colegios": {str(colegio): dict(datos) for colegio, datos in self.colegios.items()},
+                "estudiantes": [[str(c), e, dict(datos)] for (c, e), datos in self.estudiantes.items()]
+            }
+
+    def combinar(self, estado, colegio):
+        """Suma las mediciones de `estado` (MetricasEjecucion.estado de un solo colegio) atribuyéndolas a `colegio`."""
+        with self._lock:
+            for fase, datos in estado.get("fases", {}).items():
+                total = self.fases.setdefault(fase, {"llamadas": 0, "segundos": 0.0, "max": 0.0})
+                total["llamadas"] += datos["llamadas"]
+                total["segundos"] += datos["segundos"]
+                total["max"] = max(total["max"], datos["max"])
+            for datos in estado.get("colegios", {}).values():
+                por_colegio = self._colegio(colegio)
+                por_colegio["segundos"] += datos["segundos"]
+                por_colegio["estudiantes"] += datos["estudiantes"]
+                por_colegio["reintentos"] += datos["reintentos"]
+                for fase, segundos in datos["fases"].items():
+                    por_colegio["fases"][fase] = por_colegio["fases"].get(fase, 0.0) + segundos
+            for _, estudiante, datos in estado.get("estudiantes", []):
+                por_estudiante = self._estudiante(colegio, estudiante)
+                por_estudiante["segundos"] += datos["segundos"]
+                por_estudiante["reintentos"] += datos["reintentos"]
+                for fase, segundos in datos["fases"].items():
+                    por_estudiante["fases"][fase] = por_estudiante["fases"].get(fase, 0.0) + segundos
+
+    def _colegio(self, colegio):
+        return self.colegios.setdefault(colegio, {"segundos": 0.0, "fases": {}, "estudiantes": 0, "reintentos": 0})
+
+    def _estudiante(self, colegio, estudiante):
+        return self.estudiantes.setdefault((colegio, estudiante), {"segundos": 0.0, "fases": {}, "reintentos": 0})
+
+    def lentos(self, n):
+        """Los n colegios y estudiantes más lentos."""
+        with self._lock:
+            colegios = sorted(self.colegios.items(), key=lambda item: item[1]["segundos"], reverse=True)[:n]
+            estudiantes = sorted(self.estudiantes.items(), key=lambda item: item[1]["segundos"], reverse=True)[:n]
+            return {
+                "colegios": [dict(colegio=colegio, **datos) for colegio, datos in colegios],
+                "estudiantes": [dict(colegio=colegio, estudiante=estudiante, **datos) for (colegio, estudiante), datos in estudiantes]
+            }
+
+    def como_dict(self, top=10):
+        with self._lock:
+            resumen = {
+                "inicio": self.inicio,
+                "segundos": time.time() - self.inicio,
+                "fases": {fase: dict(datos) for fase, datos in self.fases.items()},
+                "colegios": {colegio: dict(datos) for colegio, datos in self.colegios.items()},
+                "reintentos": sum(datos["reintentos"] for datos in self.colegios.values())
+            }
+        resumen["mas_lentos"] = self.lentos(top)
+        return resumen
+
+    def como_prometheus(self, top=10):
+        """Formato de texto de Prometheus (para el textfile collector de node_exporter). Los estudiantes solo
+        se exportan en el top de más lentos, para no disparar la cardinalidad."""
+        def etiqueta(valor):
+            return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        resumen = self.como_dict(top)
+        lineas = [
+            "# HELP qureo_ejecucion_segundos Duración total de la ejecución.",
+            "# TYPE qureo_ejecucion_segundos gauge",
+            f"qureo_ejecucion_segundos {resumen['segundos']:.3f}",
+            "# HELP qureo_fase_segundos_total Tiempo acumulado por fase.",
+            "# TYPE qureo_fase_segundos_total counter"
+        ]
+        lineas += [f'qureo_fase_segundos_total{{fase="{etiqueta(f)}"}} {d["segundos"]:.3f}' for f, d in resumen["fases"].items()]
+        lineas += ["# HELP qureo_fase_llamadas_total Veces que se midió cada fase.", "# TYPE qureo_fase_llamadas_total counter"]
+        lineas += [f'qureo_fase_llamadas_total{{fase="{etiqueta(f)}"}} {d["llamadas"]}' for f, d in resumen["fases"].items()]
+        lineas += ["# HELP qureo_fase_max_segundos Medición más lenta de cada fase.", "# TYPE qureo_fase_max_segundos gauge"]
+        lineas += [f'qureo_fase_max_segundos{{fase="{etiqueta(f)}"}} {d["max"]:.3f}' for f, d in resumen["fases"].items()]
+        lineas += ["# HELP qureo_colegio_segundos Duración de cada colegio.", "# TYPE qureo_colegio_segundos gauge"]
+        lineas += [f'qureo_colegio_segundos{{colegio="{etiqueta(c)}"}} {d["segundos"]:.3f}' for c, d in resumen["colegios"].items()]
+        lineas += ["# HELP qureo_colegio_fase_segundos Tiempo por fase en cada colegio.", "# TYPE qureo_colegio_fase_segundos gauge"]
+        lineas += [
+            f'qureo_colegio_fase_segundos{{colegio="{etiqueta(c)}",fase="{etiqueta(f)}"}} {s:.3f}'
+            for c, d in resumen["colegios"].items() for f, s in d["fases"].items()
+        ]
+        lineas += ["# HELP qureo_colegio_estudiantes Estudiantes procesados por colegio.", "# TYPE qureo_colegio_estudiantes gauge"]
+        lineas += [f'qureo_colegio_estudiantes{{colegio="{etiqueta(c)}"}} {d["estudiantes"]}' for c, d in resumen["colegios"].items()]
+        lineas += ["# HELP qureo_colegio_reintentos_total Reintentos de estudiantes por colegio.", "# TYPE qureo_colegio_reintentos_total counter"]
+        lineas += [f'qureo_colegio_reintentos_total{{colegio="{etiqueta(c)}"}} {d["reintentos"]}' for c, d in resumen["colegios"].items()]
+        lineas += ["# HELP qureo_estudiante_lento_segundos Estudiantes más lentos de la ejecución.", "# TYPE qureo_estudiante_lento_segundos gauge"]
+        lineas += [
+            f'qureo_estudiante_lento_segundos{{colegio="{etiqueta(e["colegio"])}",estudiante="{etiqueta(e["estudiante"])}"}} {e["segundos"]:.3f}'
+            for e in resumen["mas_lentos"]["estudiantes"]
+        ]
+        return "\n".join(lineas) + "\n"
+
+    def exportar(self, ruta, top=10):
+        """Guarda las métricas en `ruta`: texto de Prometheus si termina en .prom o .txt y JSON en otro caso."""
+        if ruta.endswith((".prom", ".txt")):
+            contenido = self.como_prometheus(top)
+        else:
+            contenido = json.dumps(self.como_dict(top), ensure_ascii=False, indent=1)
+        temporal = f"{ruta}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(contenido)
+        os.replace(temporal, ruta)
+
+    def registrar_lentos(self, top=10):
+        """Deja en el log el tiempo por fase y los colegios y estudiantes más lentos."""
+        with self._lock:
+            fases = sorted(self.fases.items(), key=lambda item: item[1]["segundos"], reverse=True)
+        for fase, datos in fases:
+            logger.info(f"Fase {fase}: {datos['segundos']:.1f} s en {datos['llamadas']} llamadas (máx. {datos['max']:.2f} s)")
+        lentos = self.lentos(top)
+        for datos in lentos["colegios"]:
+            logger.info(f"Colegio lento: {datos['colegio']} {datos['segundos']:.1f} s, {datos['estudiantes']} estudiantes, {datos['reintentos']} reintentos")
+        for datos in lentos["estudiantes"]:
+            logger.info(f"Estudiante lento: {datos['estudiante']} ({datos['colegio']}) {datos['segundos']:.1f} s, {datos['reintentos']} reintentos")
+
+# Canal de eventos entre los hilos de extracción y la GUI/CLI
+class CanalEventos:
+    """Recibe eventos de progreso sin bloquear y los entrega agregados al consumidor, que los lee a
+    frecuencia fija. El progreso se acumula en contadores, del estado solo se guarda el último texto y los
+    mensajes (errores, avisos) se encolan en orden."""
+
+    def __init__(self, max_mensajes=1000):
+        self._lock = threading.Lock()
+        self._reinicio = None  # nuevo máximo de la barra de progreso
+        self._maximo = 0
+        self._valor = 0
+        self._estado = None
+        self._habilitar = False
+        self._mensajes = deque(maxlen=max_mensajes)
+
+    def progreso(self, maximo=0, valor=0):
+        with self._lock:
+            self._maximo += maximo
+            self._valor += valor
+
+    def reiniciar_progreso(self, maximo):
+        with self._lock:
+            self._reinicio = maximo
+            self._maximo = 0
+            self._valor = 0
+
+    def estado(self, texto):
+        with self._lock:
+            self._estado = texto
+
+    def mensaje(self, tipo, titulo, texto):
+        """tipo: "error" o "info"."""
+        with self._lock:
+            self._mensajes.append((tipo, titulo, texto))
+
+    def habilitar_botones(self):
+        with self._lock:
+            self._habilitar = True
+
+    def drenar(self):
+        """Devuelve y vacía lo acumulado desde la última lectura."""
+        with self._lock:
+            eventos = {
+                "reinicio": self._reinicio,
+                "maximo": self._maximo,
+                "valor": self._valor,
+                "estado": self._estado,
+                "habilitar": self._habilitar,
+                "mensajes": list(self._mensajes)
+            }
+            self._reinicio = None
+            self._maximo = self._valor = 0
+            self._estado = None
+            self._habilitar = False
+            self._mensajes.clear()
+        return eventos
+
+
+# Timeouts que se ajustan a la latencia observada en cada colegio
+class TiemposAdaptativos:
+    """Guarda las últimas duraciones de cada tipo de espera de un colegio y calcula su timeout como
+    percentil × factor. Las esperas agotadas se registran con su timeout, para que el siguiente crezca."""
+
+    def __init__(self, iniciales=None, percentil=95, factor=4, minimo_ms=2000, maximo_ms=60000, ventana=100):
+        self.iniciales = dict(TIMEOUTS_INICIALES_MS if iniciales is None else iniciales)
+        self.percentil = percentil
+        self.factor = factor
+        self.minimo_ms = minimo_ms
+        self.maximo_ms = maximo_ms
+        self.ventana = ventana
+        self.muestras = {}  # tipo -> deque de segundos
+        self._lock = threading.Lock()
+
+    def registrar(self, tipo, segundos):
+        with self._lock:
+            self.muestras.setdefault(tipo, deque(maxlen=self.ventana)).append(segundos)
+
+    def percentil_segundos(self, tipo, percentil=None):
+        """Percentil de las duraciones registradas, o None si aún no hay suficientes."""
+        with self._lock:
+            muestras = sorted(self.muestras.get(tipo, ()))
+        if len(muestras) < MUESTRAS_MIN_TIMEOUT:
+            return None
+        percentil = self.percentil if percentil is None else percentil
+        return muestras[min(len(muestras) - 1, int(len(muestras) * percentil / 100))]
+
+    def timeout_ms(self, tipo):
+        segundos = self.percentil_segundos(tipo)
+        if segundos is None:
+            return self.iniciales.get(tipo, self.maximo_ms)
+        return int(min(self.maximo_ms, max(self.minimo_ms, segundos * 1000 * self.factor)))
+
+    def espera_reintento(self):
+        """Pausa base antes de reintentar un estudiante: la mediana de carga de página del colegio, entre 0,2 y 1 s."""
+        mediana = self.percentil_segundos("carga_pagina", 50)
+        return 1.0 if mediana is None else min(1.0, max(0.2, mediana))
+
+    def resumen(self):
+        with self._lock:
+            tipos = list(self.muestras)
+        return {tipo: self.timeout_ms(tipo) for tipo in tipos}
+
+# Etapa de reporte: operaciones vectorizadas sobre las columnas, sin apply por fila
+COLUMNAS_CLAVE = ["Aula", "Grado", "Sección", "Estudiante", "Curso"]
+
+PATRON_CAPITULOS = re.compile(r"^\s*([+-]?\d+)\s*/\s*([+-]?\d+)\s*$")
+
+def separar_capitulos(serie):
+    """Convierte textos 'completados/total' en dos Series enteras; los valores sin ese formato quedan en 0."""
+    partes = serie.astype(str).str.extract(PATRON_CAPITULOS.pattern)
+    completados = pd.to_numeric(partes[0], errors="coerce")
+    total = pd.to_numeric(partes[1], errors="coerce")
+    validos = completados.notna() & total.notna()
+    return completados.where(validos, 0).astype("int64"), total.where(validos, 0).astype("int64")
+
+def preparar_datos_colegio(df):
+    """Agrega las columnas numéricas de capítulos y usa dtype category en las columnas de texto repetido.
+    Los DataFrames de AcumuladorFilas ya vienen así y se devuelven sin copiar."""
+    columnas_texto = ("Aula", "Curso", "Estudiante")
+    if "Capítulos completados" in df.columns and all(isinstance(df[c].dtype, pd.CategoricalDtype) for c in columnas_texto):
+        return df
+    df = df.copy()
+    if "Capítulos completados" not in df.columns:
+        df["Capítulos completados"], df["Total capítulos"] = separar_capitulos(df["Capítulos finalizados"])
+    for columna in columnas_texto:
+        df[columna] = df[columna].astype("category")
+    return df
+
+def parsear_capitulos(texto):
+    """Versión escalar de separar_capitulos: (completados, total), o (0, 0) si el texto no es 'x/y'."""
+    coincidencia = PATRON_CAPITULOS.match(str(texto))
+    if coincidencia is None:
+        return 0, 0
+    return int(coincidencia.group(1)), int(coincidencia.group(2))
+
+# Acumulador columnar de las filas extraídas de un colegio
+class AcumuladorFilas:
+    """Guarda las filas (aula, grado, sección, estudiante, curso, capítulos) de un colegio en columnas
+    compactas: cada texto se codifica con un diccionario (un entero por fila y una sola copia de cada valor)
+    y los capítulos se guardan ya convertidos a enteros. a_dataframe devuelve un DataFrame con columnas
+    category y las filas ordenadas por el orden de los estudiantes, aunque se hayan agregado desordenadas."""
+
+    COLUMNAS = ["Aula", "Grado", "Sección", "Estudiante", "Curso", "Capítulos finalizados"]
+
+    def __init__(self):
+        self._diccionarios = [{} for _ in self.COLUMNAS]
+        self._codigos = [array("i") for _ in self.COLUMNAS]
+        self._completados = array("q")
+        self._totales = array("q")
+        self._orden = array("q")
+        self._ordenado = True
+
+    def __len__(self):
+        return len(self._orden)
+
+    def agregar(self, orden, filas):
+        """Agrega las filas (tuplas en el orden de COLUMNAS) del estudiante en la posición `orden`."""
+        if self._orden and orden < self._orden[-1]:
+            self._ordenado = False
+        for fila in filas:
+            for diccionario, codigos, valor in zip(self._diccionarios, self._codigos, fila):
+                if valor is None:
+                    codigos.append(-1)  # código de valor faltante en pd.Categorical
+                    continue
+                codigo = diccionario.get(valor)
+                if codigo is None:
+                    codigo = diccionario[valor] = len(diccionario)
+                codigos.append(codigo)
+            completados, total = parsear_capitulos(fila[5])
+            self._completados.append(completados)
+            self._totales.append(total)
+            self._orden.append(orden)
+
+    def a_dataframe(self):
+        """DataFrame con las columnas de COLUMNAS (category) más 'Capítulos completados' y 'Total capítulos'.
+        Se llama una vez, después de agregar todas las filas."""
+        def columna(datos, dtype):
+            return np.frombuffer(datos, dtype=dtype) if len(datos) else np.empty(0, dtype=dtype)
+
+        indices = None
+        if not self._ordenado:
+            indices = np.argsort(columna(self._orden, np.int64), kind="stable")
+
+        def ordenar(valores):
+            return valores if indices is None else valores[indices]
+
+        def categorica(diccionario, codigos):
+            # Categorías ordenadas, como las de un DataFrame sin codificar: groupby(observed=True) sigue este
+            # orden, y las hojas de resumen y los gráficos por aula deben salir ordenados por aula.
+            # La última posición de `recodificar` es la del código -1 (valor faltante), que se conserva.
+            categorias = sorted(diccionario)
+            recodificar = np.full(len(categorias) + 1, -1, dtype=np.int32)
+            recodificar[[diccionario[valor] for valor in categorias]] = np.arange(len(categorias), dtype=np.int32)
+            return pd.Categorical.from_codes(recodificar[ordenar(columna(codigos, np.int32))], categories=categorias)
+
+        datos = {
+            nombre: categorica(diccionario, codigos)
+            for nombre, diccionario, codigos in zip(self.COLUMNAS, self._diccionarios, self._codigos)
+        }
+        datos["Capítulos completados"] = ordenar(columna(self._completados, np.int64))
+        datos["Total capítulos"] = ordenar(columna(self._totales, np.int64))
+        return pd.DataFrame(datos)
+
+# Columnas numéricas de progreso que escribe este reporte: con comparación (_actual) y de primera ejecución
+COLUMNAS_PROGRESO_REPORTE = [
+    ("Capítulos completados_actual", "Total capítulos_actual"),
+    ("Capítulos completados", "Total capítulos"),
+]
+
+def hoja_anterior_a_previa(df_hoja):
+    """Convierte una hoja de reporte_anterior.xlsx al formato de HistorialAvances.instantanea, o None si no sirve.
+
+    En la práctica sirve para migrar: una vez que hay historial (historial_avances.db) no se lee el Excel.
+    Acepta las hojas de avance de este reporte (columnas numéricas, con o sin _actual) y las de versiones
+    anteriores con el texto "Capítulos finalizados"."""
+    if not set(COLUMNAS_CLAVE) <= set(df_hoja.columns):
+        return None
+    # Solo se toman las claves y el progreso, para que las demás columnas de la hoja no choquen al combinar.
+    # Las claves como texto, igual que en el historial: Excel devuelve números en Grado o Sección
+    df_prev = df_hoja[COLUMNAS_CLAVE].astype(str)
+    for completados, total in COLUMNAS_PROGRESO_REPORTE:
+        if completados in df_hoja.columns and total in df_hoja.columns:
+            df_prev["Capítulos completados_prev"] = pd.to_numeric(df_hoja[completados], errors="coerce").fillna(0).astype("int64")
+            df_prev["Total capítulos_prev"] = pd.to_numeric(df_hoja[total], errors="coerce").fillna(0).astype("int64")
+            return df_prev
+    if "Capítulos finalizados" in df_hoja.columns:
+        df_prev["Capítulos completados_prev"], df_prev["Total capítulos_prev"] = separar_capitulos(df_hoja["Capítulos finalizados"])
+        return df_prev
+    return None
+
+def calcular_hoja_avance(df_actual, df_prev=None):
+    """Construye la hoja de avance de un colegio. `df_prev` trae las claves y el progreso numérico anterior
+    (columnas _prev), como lo devuelven HistorialAvances.instantanea y hoja_anterior_a_previa."""
+    if df_prev is None:
+        df_avance = df_actual[COLUMNAS_CLAVE + ["Capítulos completados", "Total capítulos"]].copy()
+        df_avance["Avance"] = "N/A (primera ejecución)"
+        return df_avance
+
+    df_merged = df_actual.rename(columns={
+        "Capítulos completados": "Capítulos completados_actual",
+        "Total capítulos": "Total capítulos_actual"
+    }).merge(df_prev, on=COLUMNAS_CLAVE, how="left")
+    df_merged["Capítulos completados_prev"] = df_merged["Capítulos completados_prev"].fillna(0)
+    df_merged["Total capítulos_prev"] = df_merged["Total capítulos_prev"].fillna(0)
+    df_merged["Avance"] = np.where(df_merged["Capítulos completados_actual"] > df_merged["Capítulos completados_prev"], "Sí", "No")
+    return df_merged[COLUMNAS_CLAVE + ["Capítulos completados_actual", "Total capítulos_actual", "Capítulos completados_prev", "Total capítulos_prev", "Avance"]]
+
+def calcular_resumen_por_aula(df_plataforma):
+    """Resumen por aula de un curso: estudiantes, promedio, capítulo más común (moda) y total de capítulos."""
+    resumen = df_plataforma.groupby("Aula", observed=True).agg(
+        Total_Estudiantes=("Estudiante", "count"),
+        Avance_Promedio=("Capítulos completados", "mean"),
+        Total_Capítulos=("Total capítulos", "max")
+    )
+    # Moda sin callbacks: el valor más frecuente por aula y, en empate, el menor (igual que Series.mode()[0])
+    conteos = df_plataforma.groupby(["Aula", "Capítulos completados"], observed=True).size().reset_index(name="n")
+    moda = (
+        conteos.sort_values(["Aula", "n", "Capítulos completados"], ascending=[True, False, True])
+        .drop_duplicates("Aula")
+        .set_index("Aula")["Capítulos completados"]
+    )
+    resumen.insert(2, "Capítulo_Más_Común", moda.reindex(resumen.index).fillna(0).astype("int64"))
+    resumen = resumen.reset_index()
+    resumen["Mensaje_Mayoría"] = (
+        "La mayoría de estudiantes está por el capítulo " + resumen["Capítulo_Más_Común"].astype(str)
+        + " de " + resumen["Total_Capítulos"].astype("int64").astype(str)
+    )
+    return resumen
+
+
+def renderizar_en_procesos(especificaciones, num_procesos):
+    """Reparte los gráficos entre `num_procesos` intérpretes que solo ejecutan graficos.py (matplotlib y
+    numpy), sin volver a importar este módulo ni hacer fork de un proceso con hilos vivos. Devuelve las rutas
+    en el orden de `especificaciones`; si un proceso falla, su parte se dibuja aquí."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "graficos.py")
+    lotes = [especificaciones[i::num_procesos] for i in range(num_procesos)]
+    procesos = []
+    for lote in lotes:
+        proceso = subprocess.Popen([sys.executable, script], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        proceso.stdin.write(json.dumps(lote).encode("utf-8"))
+        proceso.stdin.close()
+        procesos.append(proceso)
+    rutas = [None] * len(especificaciones)
+    for i, (lote, proceso) in enumerate(zip(lotes, procesos)):
+        salida = proceso.stdout.read()
+        proceso.stdout.close()
+        if proceso.wait() == 0:
+            rutas_lote = json.loads(salida)
+        else:
+            logger.warning(f"Falló un proceso de gráficos (código {proceso.returncode}); se dibujan aquí {len(lote)} gráficos.")
+            rutas_lote = [renderizar_grafico(e) for e in lote]
+        rutas[i::num_procesos] = rutas_lote
+    return rutas
+
+
+# Escritura del reporte en streaming: un hilo consume cada colegio en cuanto termina su extracción y lo escribe
+# con xlsxwriter en modo constant_memory (fila por fila), respetando el orden del archivo de credenciales
+class EscritorReporte:
+    """Hilo consumidor del reporte de avances. Recibe (posicion, colegio, df_datos) por una cola, calcula las
+    hojas del colegio, las escribe y guarda su progreso en el historial. De cada colegio solo se conservan los
+    datos agregados de sus gráficos, así que la memoria no crece con el número de colegios.
+
+    Las hojas se escriben en el orden de las credenciales. Con `cargar(colegio)` (que relee df_datos del
+    almacén), de un colegio que termina antes que otro anterior solo se guarda el nombre y sus filas se
+    releen en su turno, en lugar de retener su DataFrame mientras espera."""
+
+    _FIN = object()
+    _RECARGAR = object()
+
+    def __init__(self, app, ruta, cargar=None):
+        self.app = app
+        self.ruta = ruta
+        self.cargar = cargar
+        self.ts = time.time()
+        self.cola = queue.Queue()
+        self.libro = None
+        self.formato_encabezado = None
+        self.hojas = set()
+        self.en_espera = {}  # colegios que terminaron antes que alguno anterior en el orden de credenciales
+        self.siguiente = 0
+        self.graficos = []  # (colegio, especificaciones por aula, avance Qureo, avance JavaScript)
+        self.error = None
+        self.hilo = threading.Thread(target=self._consumir, name="reporte", daemon=True)
+        self.hilo.start()
+
+    def enviar(self, posicion, colegio, df_datos):
+        """Entrega el resultado de un colegio. Con df_datos None (colegio con error) solo avanza el turno."""
+        self.cola.put((posicion, colegio, df_datos))
+
+    def cerrar(self):
+        """Espera a que se escriban los colegios pendientes y cierra el libro. Devuelve los datos de los gráficos."""
+        if self.hilo.is_alive():
+            self.cola.put(self._FIN)
+            self.hilo.join()
+        if self.error is not None:
+            raise self.error
+        if self.libro is not None:
+            with self.app.metricas.medir("escritura_excel"):
+                self.libro.close()
+            self.libro = None
+        return self.graficos
+
+    def _consumir(self):
+        while True:
+            item = self.cola.get()
+            if item is self._FIN:
+                break
+            posicion, colegio, df_datos = item
+            if posicion != self.siguiente and df_datos is not None and self.cargar is not None:
+                df_datos = self._RECARGAR
+            self.en_espera[posicion] = (colegio, df_datos)
+            while self.siguiente in self.en_espera:
+                self._escribir(*self.en_espera.pop(self.siguiente))
+                self.siguiente += 1
+        # Si faltó alguna posición, lo recibido se escribe igual, en orden
+        for posicion in sorted(self.en_espera):
+            self._escribir(*self.en_espera.pop(posicion))
+
+    def _escribir(self, colegio, df_datos):
+        if df_datos is None or self.error is not None:
+            return
+        try:
+            if df_datos is self._RECARGAR:
+                with self.app.metricas.medir("recarga_almacen", colegio):
+                    df_datos = self.cargar(colegio)
+            with self.app.metricas.medir("escritura_excel", colegio):
+                self._escribir_colegio(colegio, df_datos)
+        except Exception as e:
+            logger.error(f"Error al escribir el reporte de {colegio}: {str(e)}")
+            self.error = e
+
+    def _escribir_colegio(self, colegio, df_datos):
+        app = self.app
+        if self.libro is None:
+            import xlsxwriter
+            self.libro = xlsxwriter.Workbook(self.ruta, {"constant_memory": True})
+            # Mismo formato de encabezado que DataFrame.to_excel
+            self.formato_encabezado = self.libro.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+
+        df_actual = preparar_datos_colegio(df_datos)
+        self._escribir_hoja(app.truncate_sheet_name(colegio), calcular_hoja_avance(df_actual, app.progreso_anterior(colegio)))
+        app.historial.registrar(colegio, app.run_id, self.ts, df_actual)
+
+        especificaciones, avance_qureo, avance_js = [], 0, 0
+        for plataforma in df_actual["Curso"].unique():
+            plat_name = app.taxonomia.plataforma(plataforma)
+            if plat_name is None:
+                continue
+
+            # Comparar contra una columna category compara códigos enteros, no cadenas
+            df_plataforma = df_actual[df_actual["Curso"] == plataforma]
+            resumen_por_aula = calcular_resumen_por_aula(df_plataforma)
+            self._escribir_hoja(app.truncate_sheet_name(colegio, f"_Resumen_{plat_name}"), resumen_por_aula)
+            logger.debug(f"Resumen por aula generado para {colegio} ({plat_name}): {resumen_por_aula}")
+
+            especificaciones.append(app.especificacion_grafico_aula(colegio, plat_name, df_plataforma))
+            avance_promedio = float(df_plataforma["Capítulos completados"].mean())
+            if plat_name == "Qureo":
+                avance_qureo = avance_promedio
+            else:
+                avance_js = avance_promedio
+        self.graficos.append((colegio, especificaciones, avance_qureo, avance_js))
+        logger.info(f"Reporte de {colegio} escrito en {self.ruta}")
+
+    def _escribir_hoja(self, nombre, df):
+        # En constant_memory no se puede volver a una hoja ya escrita: los nombres repetidos se desambiguan
+        base, n = nombre, 2
+        while nombre.lower() in self.hojas:
+            sufijo = f"~{n}"
+            nombre = f"{base[:31 - len(sufijo)]}{sufijo}"
+            n += 1
+        if nombre != base:
+            logger.warning(f"La hoja '{base}' ya existe en el reporte, se escribe como '{nombre}'")
+        self.hojas.add(nombre.lower())
+
+        hoja = self.libro.add_worksheet(nombre)
+        hoja.write_row(0, 0, [str(columna) for columna in df.columns], self.formato_encabezado)
+        for fila, valores in enumerate(df.itertuples(index=False, name=None), start=1):
+            hoja.write_row(fila, 0, [None if pd.isna(valor) else valor for valor in valores])
+
+
+# Códigos de salida del modo --headless
+SALIDA_OK = 0
+SALIDA_ERROR = 1  # no se generó el reporte (credenciales inválidas, ningún colegio procesado, fallo del reporte)
+SALIDA_PARCIAL = 2  # reporte generado, pero con colegios con error o estudiantes omitidos
+
 # Clase principal de la aplicación
 class QureoApp:
-    def __init__(self, master):
+    def __init__(self, master=None, ruta_credenciales="credenciales_colegios.xlsx",
+                 ruta_reporte_anterior="reporte_anterior.xlsx", ruta_reporte="reporte_avances.xlsx",
+                 directorio_graficos="graficos"):
+        # Sin master (modo --headless) no se crea ningún widget y los mensajes van al log
         self.master = master
-        self.master.title("Script de revisión de avance - Múltiples Colegios")
-        self.master.geometry("400x250")
-        self.master.configure(bg="#003366")
-
-        self.boton_iniciar = tk.Button(master, text="Iniciar proceso con credenciales XLSX", bg="#3399FF", fg="white", command=self.iniciar_proceso)
-        self.boton_iniciar.pack(pady=10)
+        self.ruta_credenciales = ruta_credenciales
+        self.ruta_reporte_anterior = ruta_reporte_anterior
+        self.ruta_reporte = ruta_reporte
+        self.directorio_graficos = directorio_graficos
+
+        if master is not None:
+            import tkinter as tk
+            from tkinter import ttk
+
+            self.master.title("Script de revisión de avance - Múltiples Colegios")
+            self.master.geometry("400x290")
+            self.master.configure(bg="#003366")
+
+            self.boton_iniciar = tk.Button(master, text="Iniciar proceso con credenciales XLSX", bg="#3399FF", fg="white", command=self.iniciar_proceso)
+            self.boton_iniciar.pack(pady=10)
+
+            self.boton_reanudar = tk.Button(master, text="Reanudar ejecución interrumpida", bg="#3399FF", fg="white", command=lambda: self.iniciar_proceso(reanudar=True))
+            self.boton_reanudar.pack(pady=5)
+
+            self.progress = ttk.Progressbar(master, orient="horizontal", length=300, mode="determinate")
+            self.progress.pack(pady=10)
+
+            self.estado = tk.Label(master, text="", bg="#003366", fg="white")
+            self.estado.pack()
+
+        self._lock_progreso = threading.Lock()
+        self._estudiantes_procesados = 0
+        self.politica_recursos = None
+        self.almacen = None
+        self.run_id = None
+        self.reanudar = REANUDAR
+        self.reanudar_al_iniciar = REANUDAR  # lo que hace el botón Iniciar de la GUI
+        self.incremental = INCREMENTAL
+        # Ajustes de extracción por instancia: el daemon aplica los de cada cliente sin tocar los globales
+        self.paginas_por_colegio = TAMANO_POOL_PAGINAS
+        self.modo_extraccion = MODO_EXTRACCION
+        self.historial = None
+        self.comparar_desde = COMPARAR_DESDE
+        self._hojas_anteriores = None
+        self.cache_sesiones = CacheSesiones(DIRECTORIO_SESIONES, SESION_MAX_HORAS) if CACHE_SESIONES else None
+        self.metricas = MetricasEjecucion()
+        self.ruta_metricas = RUTA_METRICAS
+        self.tiempos = {}  # colegio -> TiemposAdaptativos
+        self.taxonomia = TaxonomiaCursos.cargar(RUTA_TAXONOMIA)
+        # Los hilos de trabajo solo publican en el canal; la GUI lo lee a frecuencia fija desde el hilo de Tk
+        self.eventos = CanalEventos()
+        if master is not None:
+            self.master.after(INTERVALO_EVENTOS_GUI_MS, self._atender_eventos_gui)
+
+    def _atender_eventos_gui(self):
+        """Aplica en la GUI lo acumulado en el canal de eventos y se vuelve a programar."""
+        from tkinter import messagebox
+
+        self.master.after(INTERVALO_EVENTOS_GUI_MS, self._atender_eventos_gui)
+        eventos = self.eventos.drenar()
+        if eventos["reinicio"] is not None:
+            self.progress["maximum"] = eventos["reinicio"]
+            self.progress["value"] = 0
+        if eventos["maximo"] or eventos["valor"]:
+            self.progress["maximum"] = self.progress["maximum"] + eventos["maximo"]
+            self.progress["value"] = self.progress["value"] + eventos["valor"]
+        if eventos["estado"] is not None:
+            self.estado.config(text=eventos["estado"])
+        if eventos["habilitar"]:
+            self.boton_iniciar.config(state="normal")
+            self.boton_reanudar.config(state="normal")
+        for tipo, titulo, texto in eventos["mensajes"]:
+            (messagebox.showerror if tipo == "error" else messagebox.showinfo)(titulo, texto)
+
+    @contextmanager
+    def consumidor_eventos_cli(self, intervalo=INTERVALO_EVENTOS_CLI):
+        """Modo --headless: un hilo lee el canal cada `intervalo` segundos y registra el último estado."""
+        detener = threading.Event()
+
+        def consumir():
+            while True:
+                terminado = detener.wait(intervalo)
+                estado = self.eventos.drenar()["estado"]
+                if estado is not None:
+                    logger.info(estado)
+                if terminado:
+                    return
 
-        self.progress = ttk.Progressbar(master, orient="horizontal", length=300, mode="determinate")
-        self.progress.pack(pady=10)
+        hilo = threading.Thread(target=consumir, name="eventos", daemon=True)
+        hilo.start()
+        try:
+            yield
+        finally:
+            detener.set()
+            hilo.join()
 
-        self.estado = tk.Label(master, text="", bg="#003366", fg="white")
-        self.estado.pack()
+    def iniciar_proceso(self, reanudar=None):
+        from tkinter import messagebox
 
-    def iniciar_proceso(self):
-        if not os.path.exists("credenciales_colegios.xlsx"):
-            messagebox.showerror("Error", "No se encontró 'credenciales_colegios.xlsx'. Crea el archivo con columnas: Colegio,Usuario,Contraseña.")
+        if not os.path.exists(self.ruta_credenciales):
+            messagebox.showerror("Error", f"No se encontró '{self.ruta_credenciales}'. Crea el archivo con columnas: Colegio,Usuario,Contraseña.")
             return
 
+        # Sin `reanudar` explícito (botón Iniciar) se usa el de QUREO_REANUDAR o --reanudar
+        self.reanudar = self.reanudar_al_iniciar if reanudar is None else reanudar
         self.boton_iniciar.config(state="disabled")
-        self.estado.config(text="Iniciando proceso...")
+        self.boton_reanudar.config(state="disabled")
+        self.estado.config(text="Reanudando proceso..." if self.reanudar else "Iniciando proceso...")
         threading.Thread(target=self.procesar_colegios).start()
 
+    def habilitar_botones(self):
+        """Vuelve a habilitar los botones de inicio de forma segura desde un hilo."""
+        if self.master is None:
+            return
+        self.eventos.habilitar_botones()
+
     def update_gui(self, text):
-        """Función para actualizar la GUI de forma segura desde un hilo."""
-        self.master.after(0, lambda: self.estado.config(text=text))
+        """Publica el texto de estado; la GUI (o el log en --headless) muestra el último a frecuencia fija."""
+        self.eventos.estado(text)
 
     def show_error(self, title, message):
         """Función para mostrar un mensaje de error de forma segura desde un hilo."""
-        self.master.after(0, lambda: messagebox.showerror(title, message))
+        if self.master is None:
+            logger.error(f"{title}: {message}")
+            return
+        self.eventos.mensaje("error", title, message)
+
+    def show_info(self, title, message):
+        """Función para mostrar un mensaje informativo de forma segura desde un hilo."""
+        if self.master is None:
+            logger.info(f"{title}: {message}")
+            return
+        self.eventos.mensaje("info", title, message)
 
     def truncate_sheet_name(self, name, suffix=""):
         """Trunca el nombre de la hoja a 31 caracteres, considerando el sufijo, elimina caracteres inválidos y asegura unicidad."""
@@ -68,470 +1659,1312 @@ class QureoApp:
 
     def normalize_text(self, text):
         """Normaliza texto eliminando acentos y convirtiendo a mayúsculas."""
-        text = ''.join(c for c in unicodedata.normalize('NFKD', text) if unicodedata.category(c) != 'Mn')
-        return text.strip().upper()
-
-    def procesar_colegios(self):
-        start_time = time.time()
-        BASE_URL = "https://sa-admin.qureo.education"
-        datos_por_colegio = {}
-        estudiantes_omitidos_global = []
-        colegios_con_errores = []
-
-        colegios_especiales = [
-            "CARLOS PHILLIPS",
-            "19 DE JUNIO",
-            "8 DE DICIEMBRE",
-            "JOSÉ BAQUIJANO Y CARRILLO"
-        ]
-        colegios_especiales_normalized = [self.normalize_text(c) for c in colegios_especiales]
-
-        grupo_mapping = {
-            "CARLOS PHILLIPS": "GRUPO 1",
-            "JOSÉ BAQUIJANO Y CARRILLO": "GRUPO 2",
-            "19 DE JUNIO": "GRUPO 3",
-            "8 DE DICIEMBRE": "GRUPO 4"
-        }
+        return normalizar_texto(text)
 
+    def ajustar_progreso(self, maximo=0, valor=0):
+        """Suma al máximo y al valor de la barra de progreso de forma segura desde un hilo."""
+        if self.master is None:
+            return
+        self.eventos.progreso(maximo, valor)
+
+    def estudiante_procesado(self, posicion, total_colegios):
+        """Cuenta un estudiante procesado y publica el progreso (la GUI lo agrega y lo muestra por cuadro)."""
+        with self._lock_progreso:
+            self._estudiantes_procesados += 1
+            procesados = self._estudiantes_procesados
+        self.ajustar_progreso(valor=1)
+        self.update_gui(f"Procesado {procesados} estudiantes (colegio {posicion+1}/{total_colegios})")
+
+    def tiempos_colegio(self, colegio):
+        """TiemposAdaptativos del colegio, creado en su primera espera."""
+        with self._lock_progreso:
+            if colegio not in self.tiempos:
+                self.tiempos[colegio] = TiemposAdaptativos(
+                    percentil=PERCENTIL_TIMEOUT, factor=FACTOR_TIMEOUT, minimo_ms=TIMEOUT_MIN_MS, maximo_ms=TIMEOUT_MAX_MS
+                )
+            return self.tiempos[colegio]
+
+    @contextmanager
+    def espera(self, fase, colegio, estudiante=None):
+        """Entrega el timeout adaptativo (ms) de la fase, mide la espera en las métricas y la registra en los
+        tiempos del colegio: su duración si termina, o el timeout completo si se agota."""
+        tiempos = self.tiempos_colegio(colegio)
+        timeout = tiempos.timeout_ms(fase)
+        inicio = time.perf_counter()
         try:
-            credenciales_df = pd.read_excel("credenciales_colegios.xlsx", sheet_name=0)
-            required_columns = ["Colegio", "Usuario", "Contraseña"]
-            if not all(col in credenciales_df.columns for col in required_columns):
-                missing_cols = [col for col in required_columns if col not in credenciales_df.columns]
-                self.show_error("Error", f"El archivo XLSX no contiene las columnas requeridas: {', '.join(missing_cols)}")
-                self.update_gui("Error en el archivo XLSX")
-                self.master.after(0, lambda: self.boton_iniciar.config(state="normal"))
-                return
-
-            if credenciales_df[required_columns].isna().any().any():
-                self.show_error("Error", "El archivo 'credenciales_colegios.xlsx' contiene valores vacíos o NaN en las columnas Colegio, Usuario o Contraseña.")
-                self.update_gui("Error: Valores inválidos en el archivo XLSX")
-                self.master.after(0, lambda: self.boton_iniciar.config(state="normal"))
-                return
-
-            credenciales_df = credenciales_df.dropna(subset=required_columns)
-            total_colegios = len(credenciales_df)
-            if total_colegios == 0:
-                self.show_error("Error", "No hay colegios válidos en 'credenciales_colegios.xlsx'.")
-                self.update_gui("Error: No hay colegios válidos")
-                self.master.after(0, lambda: self.boton_iniciar.config(state="normal"))
-                return
-
-            logger.info(f"Procesando {total_colegios} colegios.")
-
-            reporte_anterior_path = "reporte_anterior.xlsx"
-            df_anterior = {}
-            if os.path.exists(reporte_anterior_path):
+            yield timeout
+        except PlaywrightTimeoutError:
+            tiempos.registrar(fase, timeout / 1000)
+            raise
+        else:
+            tiempos.registrar(fase, time.perf_counter() - inicio)
+        finally:
+            self.metricas.registrar(fase, time.perf_counter() - inicio, colegio, estudiante)
+
+    def separar_aula(self, nombre_aula, colegio):
+        """Obtiene (grado, sección) a partir del nombre del aula con formato 'grado-sección'."""
+        if "-" in nombre_aula:
+            try:
+                grado, seccion = nombre_aula.split("-", 1)[:2]
+                return grado, seccion
+            except ValueError:
+                logger.warning(f"Formato de aula inválido: {nombre_aula} en {colegio}")
+        else:
+            logger.warning(f"Aula sin guion: {nombre_aula} en {colegio}")
+        return "Desconocido", "Desconocida"
+
+    def curso_relevante(self, titulo):
+        """Indica si el título corresponde a uno de los cursos que se reportan."""
+        return self.taxonomia.relevante(titulo)
+
+    def cursos_desde_dom(self, new_page, nombre, nombre_aula, colegio):
+        """Lee los acordeones con una sola llamada a evaluate, expande solo los cursos relevantes cuyo
+        progreso aún no está en el DOM y vuelve a leerlos en lote. Devuelve [(titulo, progreso_texto)]."""
+        acordeones = new_page.evaluate(SCRIPT_ACORDEONES)
+        logger.debug(f"Estudiante {nombre} en aula {nombre_aula} ({colegio}): Encontrados {len(acordeones)} acordeones")
+
+        seleccionados = []  # (indice, titulo)
+        titulos_leidos = []
+        for i, (titulo, _, _, _) in enumerate(acordeones, 1):
+            titulo = titulo.strip() if titulo is not None else "Curso sin título"
+            logger.debug(f"Acordeón {i}: {titulo}")
+
+            # Filtrar cursos no relevantes primero
+            if not self.curso_relevante(titulo):
+                logger.debug(f"Curso {titulo} descartado para {nombre} en aula {nombre_aula} ({colegio})")
+                continue
+
+            # Evitar procesar cursos duplicados
+            if titulo in titulos_leidos:
+                logger.warning(f"Curso {titulo} ya procesado para {nombre} en aula {nombre_aula} ({colegio}), omitiendo")
+                continue
+            seleccionados.append((i - 1, titulo))
+            titulos_leidos.append(titulo)
+
+        # Expandir solo los acordeones colapsados que todavía no muestran su progreso
+        por_expandir = [i for i, _ in seleccionados if acordeones[i][1] == "false" and acordeones[i][3] is None and acordeones[i][2]]
+        fallidos = set()
+        if por_expandir:
+            elementos = new_page.query_selector_all("//div[contains(@class,'MuiAccordionSummary-root') and .//h3]")
+            for i in por_expandir:
                 try:
-                    df_anterior = pd.read_excel(reporte_anterior_path, sheet_name=None)
+                    with self.espera("expandir_curso", colegio, nombre) as timeout:
+                        elementos[i].scroll_into_view_if_needed(timeout=timeout)
+                        elementos[i].click(timeout=timeout)
                 except Exception as e:
-                    logger.warning(f"Error al leer reporte_anterior.xlsx: {str(e)}. Se ignorará.")
-                    os.remove(reporte_anterior_path)
-
-            self.progress["maximum"] = total_colegios * 100
-            self.progress["value"] = 0
-
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-
-                for idx, row in credenciales_df.iterrows():
-                    colegio = row["Colegio"]
-                    usuario = row["Usuario"]
-                    contrasena = row["Contraseña"]
-                    logger.info(f"Procesando colegio: {colegio}")
-
-                    colegio_normalized = self.normalize_text(colegio)
-                    datos = []
-                    estudiantes_omitidos = []
-                    context = browser.new_context(viewport={"width": 1920, "height": 1080}, no_viewport=False)
-                    page = context.new_page()
+                    logger.warning(f"Error al expandir acordeón {acordeones[i][0]} para {nombre} en aula {nombre_aula} ({colegio}): {str(e)}")
+                    fallidos.add(i)
+            # Esperar a que el progreso de los acordeones expandidos aparezca en el DOM, no un tiempo fijo
+            expandidos = [i for i in por_expandir if i not in fallidos]
+            if expandidos:
+                try:
+                    with self.espera("espera_expansion", colegio, nombre) as timeout:
+                        new_page.wait_for_function(SCRIPT_PROGRESO_LISTO, arg=expandidos, timeout=timeout)
+                except PlaywrightTimeoutError:
+                    logger.warning(f"El progreso de algún curso no apareció tras expandirlo para {nombre} en aula {nombre_aula} ({colegio})")
+            acordeones = new_page.evaluate(SCRIPT_ACORDEONES)
+
+        cursos = []
+        for i, titulo in seleccionados:
+            if i >= len(acordeones) or i in fallidos:
+                continue
+            # Verificar visibilidad
+            if not acordeones[i][2]:
+                logger.warning(f"Acordeón {i + 1} no visible para {nombre} en aula {nombre_aula} ({colegio})")
+                continue
+            progreso_texto = acordeones[i][3].strip() if acordeones[i][3] is not None else "0"
+            logger.debug(f"Progreso en {titulo}: {progreso_texto}")
+            cursos.append((titulo, progreso_texto))
+        return cursos
+
+    def cursos_desde_red(self, captura, nombre, nombre_aula, colegio):
+        """Lee los cursos de las respuestas JSON capturadas de la página del estudiante. Devuelve [(titulo, progreso_texto)]."""
+        cursos = []
+        for cuerpo in captura.consumir(PATRON_URL_CURSOS):
+            cursos.extend(cursos_en_json(cuerpo))
+        if cursos:
+            logger.debug(f"Estudiante {nombre} en aula {nombre_aula} ({colegio}): {len(cursos)} cursos leídos desde la red")
+        return cursos
+
+    def filas_estudiante(self, cursos, nombre, nombre_aula, grado, seccion, colegio):
+        """Construye las filas del estudiante a partir de [(titulo, progreso_texto)], completando los cursos
+        faltantes. Cada fila es una tupla en el orden de AcumuladorFilas.COLUMNAS."""
+        datos = []
+        cursos_validos = []
+        for titulo, progreso_texto in cursos:
+            if not self.curso_relevante(titulo) or titulo in cursos_validos:
+                continue
+            datos.append((nombre_aula, grado, seccion, nombre, titulo, progreso_texto))
+            cursos_validos.append(titulo)
+
+        # Registrar cursos faltantes
+        if len(cursos_validos) < len(self.taxonomia.titulos_por_defecto):
+            logger.debug(f"Sin cursos válidos suficientes, registrando ambos cursos")
+            for curso in self.taxonomia.titulos_por_defecto:
+                if curso not in cursos_validos:
+                    datos.append((nombre_aula, grado, seccion, nombre, curso, "0"))
+                    logger.debug(f"Registrado {curso} con 0 capítulos finalizados")
+        return datos
+
+    def extraer_cursos_estudiante(self, new_page, nombre, nombre_aula, grado, seccion, colegio, captura=None):
+        """Lee los cursos de una página de estudiante ya cargada. Con `captura` (modo red) se usan las respuestas
+        JSON de la página y el DOM queda como respaldo. Devuelve la lista de filas."""
+        # Esperar explícitamente a que los acordeones estén presentes
+        try:
+            with self.espera("espera_acordeones", colegio, nombre) as timeout:
+                new_page.wait_for_selector(
+                    "//div[contains(@class,'MuiAccordionSummary-root') and .//h3]",
+                    state="visible",
+                    timeout=timeout
+                )
+        except PlaywrightTimeoutError:
+            logger.warning(f"No se encontraron acordeones válidos para {nombre} en aula {nombre_aula} ({colegio})")
+            raise Exception("No se encontraron acordeones válidos")
+
+        cursos = []
+        if captura is not None:
+            cursos = self.cursos_desde_red(captura, nombre, nombre_aula, colegio)
+            if not cursos:
+                logger.debug(f"Sin datos de cursos en la red para {nombre} ({colegio}), se usa el DOM")
+        if not cursos:
+            cursos = self.cursos_desde_dom(new_page, nombre, nombre_aula, colegio)
+        return self.filas_estudiante(cursos, nombre, nombre_aula, grado, seccion, colegio)
+
+    def estudiantes_anteriores(self, colegio):
+        """{url: (huella, copias, filas)} de la última ejecución completa del colegio, o {} sin detección de cambios."""
+        if not self.incremental or self.almacen is None:
+            return {}
+        return self.almacen.huellas_anteriores(self.run_id, colegio)
+
+    def procesar_estudiantes(self, context, estudiantes_data, colegio, posicion, total_colegios, reautenticar=None, huellas=None):
+        """Carga las páginas de detalle de los estudiantes con un pool de páginas del contexto.
+
+        Se lanzan hasta `paginas_por_colegio` navegaciones a la vez y luego se recogen en orden, de modo
+        que Chromium carga varias páginas mientras se lee la primera. Los estudiantes que fallan pasan a una
+        cola diferida que solo se atiende cuando no quedan estudiantes nuevos, con espera exponencial.
+
+        Tras UMBRAL_CIRCUITO fallos consecutivos se llama a `reautenticar()` (hasta MAX_REAUTENTICACIONES
+        veces); si no se puede, se lanza una excepción con el motivo y el colegio se aborta.
+
+        `huellas` ({url: huella de su fila en la lista}) activa la detección de cambios: un estudiante cuya
+        huella coincide con la de la última ejecución completa copia sus filas sin abrir su página, salvo que
+        ya lleve MAX_COPIAS_SIN_VISITA copias seguidas. Devuelve (df_datos, estudiantes_omitidos) en el mismo
+        orden que estudiantes_data."""
+        acumulador = AcumuladorFilas()
+        omitidos = set()
+        pendientes = deque()
+        huellas = huellas or {}
+
+        # Al reanudar, los estudiantes ya capturados en la ejecución interrumpida no se vuelven a visitar
+        guardados = self.almacen.estudiantes_guardados(self.run_id, colegio) if self.almacen is not None else {}
+        anteriores = self.estudiantes_anteriores(colegio) if huellas else {}
+        reanudados = copiados = 0
+        for i, (_, nombre, url) in enumerate(estudiantes_data):
+            previo = anteriores.get(url)
+            if url in guardados:
+                acumulador.agregar(i, guardados[url])
+                reanudados += 1
+            elif previo is not None and previo[0] == huellas.get(url) and previo[1] < MAX_COPIAS_SIN_VISITA:
+                # Su fila en la lista no cambió: se copian los cursos de la ejecución anterior
+                acumulador.agregar(i, previo[2])
+                self.almacen.guardar_estudiante(self.run_id, colegio, url, i, nombre, previo[2], False, previo[0], previo[1] + 1)
+                copiados += 1
+            else:
+                pendientes.append((i, 0))
+                continue
+            self.estudiante_procesado(posicion, total_colegios)
+        if reanudados:
+            logger.info(f"Reanudando {colegio}: {reanudados} estudiantes ya capturados, {len(pendientes)} pendientes")
+        if anteriores:
+            logger.info(f"Detección de cambios en {colegio}: {copiados} estudiantes sin cambios en la lista se copian "
+                        f"de la ejecución anterior, {len(pendientes)} por visitar")
+
+        reintentos = []  # montículo de (listo_en, indice, intento)
+        en_vuelo = deque()  # (pagina, indice, intento, error_navegacion, generacion)
+        circuito = CircuitoColegio(UMBRAL_CIRCUITO, MAX_REAUTENTICACIONES if reautenticar is not None else 0)
+        pool = PoolPaginas(context, self.paginas_por_colegio, capturar_respuestas=self.modo_extraccion == "red",
+                           politica_recursos=self.politica_recursos)
+        grados_secciones = [self.separar_aula(nombre_aula, colegio) for nombre_aula, _, _ in estudiantes_data]
+        tiempos = self.tiempos_colegio(colegio)
 
+        try:
+            while pendientes or reintentos or en_vuelo:
+                # Lanzar navegaciones mientras haya páginas libres; los reintentos solo cuando no quedan estudiantes nuevos
+                while pendientes or (reintentos and reintentos[0][0] <= time.time()):
+                    pagina = pool.adquirir()
+                    if pagina is None:
+                        break
+                    if pendientes:
+                        i, intento = pendientes.popleft()
+                    else:
+                        _, i, intento = heapq.heappop(reintentos)
+                    nombre_aula, nombre, url = estudiantes_data[i]
+                    logger.debug(f"Intento {intento + 1} para estudiante {nombre} en aula {nombre_aula} ({colegio})")
+                    if pool.captura(pagina) is not None:
+                        pool.captura(pagina).reiniciar()
                     try:
-                        page.goto("https://sa-admin.qureo.education/login")
-                        page.wait_for_selector("input[name='userId']", timeout=20000)
-                        page.fill("input[name='userId']", str(usuario))
-                        page.fill("input[name='userPassword']", str(contrasena))
-                        page.click("button[type='submit']")
+                        with self.espera("goto", colegio, nombre) as timeout:
+                            pagina.goto(url, timeout=timeout, wait_until="commit")
+                        en_vuelo.append((pagina, i, intento, None, circuito.generacion))
+                    except Exception as e:
+                        en_vuelo.append((pagina, i, intento, e, circuito.generacion))
+
+                if not en_vuelo:
+                    # Solo quedan reintentos que aún no cumplen su espera
+                    if reintentos:
+                        time.sleep(max(0, reintentos[0][0] - time.time()))
+                    continue
 
+                pagina, i, intento, error, generacion = en_vuelo.popleft()
+                nombre_aula, nombre, url = estudiantes_data[i]
+                grado, seccion = grados_secciones[i]
+                try:
+                    if error is not None:
+                        raise error
+                    with self.espera("carga_pagina", colegio, nombre) as timeout:
+                        pagina.wait_for_load_state("domcontentloaded", timeout=timeout)
+                    filas = self.extraer_cursos_estudiante(pagina, nombre, nombre_aula, grado, seccion, colegio, pool.captura(pagina))
+                except Exception as e:
+                    logger.error(f"Intento {intento + 1} fallido para estudiante {nombre} en aula {nombre_aula} ({colegio}): {str(e)}")
+                    pool.liberar(pagina)
+                    if circuito.fallo(generacion):
+                        self.circuito_abierto(circuito, colegio, reautenticar)
+                    if intento < MAX_REINTENTOS_ESTUDIANTE:
+                        # Reintento diferido con espera exponencial, sin bloquear al resto de estudiantes
+                        self.metricas.reintento(colegio, nombre)
+                        espera = min(ESPERA_MAX_REINTENTO, tiempos.espera_reintento() * 2 ** intento)
+                        heapq.heappush(reintentos, (time.time() + espera, i, intento + 1))
+                        continue
+                    logger.error(f"Fallo tras reintentos, estudiante {nombre} omitido")
+                    omitidos.add(i)
+                    filas = [(nombre_aula, grado, seccion, nombre, "Error", "0")]
+                else:
+                    pool.liberar(pagina)
+                    circuito.exito(generacion)
+
+                acumulador.agregar(i, filas)
+                if self.almacen is not None:
+                    self.almacen.guardar_estudiante(self.run_id, colegio, url, i, nombre, filas, i in omitidos, huellas.get(url))
+                self.estudiante_procesado(posicion, total_colegios)
+        finally:
+            for pagina, _, _, _, _ in en_vuelo:
+                pool.liberar(pagina)
+            pool.cerrar()
+
+        estudiantes_omitidos = [estudiantes_data[i][1] for i in sorted(omitidos)]
+        return acumulador.a_dataframe(), estudiantes_omitidos
+
+    def circuito_abierto(self, circuito, colegio, reautenticar):
+        """Reautentica el colegio si el circuito lo permite; si no, lanza una excepción con el motivo."""
+        motivo = f"{circuito.consecutivos} fallos consecutivos de estudiantes"
+        if circuito.puede_reautenticar():
+            logger.warning(f"{motivo} en {colegio}, se vuelve a iniciar sesión")
+            try:
+                with self.metricas.medir("reautenticacion", colegio):
+                    reautenticar()
+                circuito.reautenticado()
+                return
+            except Exception as e:
+                motivo = f"{motivo}; falló la reautenticación: {str(e)}"
+        elif circuito.reautenticaciones:
+            motivo = f"{motivo} tras {circuito.reautenticaciones} reautenticación(es)"
+        logger.error(f"Circuito abierto en {colegio}: {motivo}. Se aborta el colegio.")
+        raise Exception(f"Circuito abierto: {motivo}")
+
+    def iniciar_sesion(self, page, usuario, contrasena):
+        """Completa el formulario de /login y espera a salir de él."""
+        page.goto(f"{BASE_URL}/login")
+        page.wait_for_selector("input[name='userId']", timeout=20000)
+        page.fill("input[name='userId']", str(usuario))
+        page.fill("input[name='userPassword']", str(contrasena))
+        page.click("button[type='submit']")
+
+        # Esperar la salida de /login en lugar de networkidle
+        try:
+            page.wait_for_url(lambda url: "login" not in url, timeout=20000)
+        except PlaywrightTimeoutError:
+            if "login" in page.url:
+                raise Exception("Fallo en el inicio de sesión.")
+            raise Exception("No se pudo cargar la página después del login.")
+
+    def reutilizar_sesion(self, page, sesion, colegio):
+        """Abre la URL guardada tras el último login. Devuelve False solo si la plataforma redirige a login o
+        muestra su formulario; si no aparece nada reconocible a tiempo, se sigue con la sesión y los pasos
+        siguientes fallan con su propio error si de verdad no es válida."""
+        selectores = ["input[name='userId']", "a[href*='/students/']"] + SELECTORES_ENLACE_ESTUDIANTES
+        try:
+            page.goto(sesion.get("url") or BASE_URL)
+            elemento = page.wait_for_selector(", ".join(selectores), timeout=20000)
+        except PlaywrightTimeoutError:
+            if "login" in page.url:
+                logger.info(f"Sesión guardada de {colegio} caducada, se inicia sesión de nuevo.")
+                return False
+            logger.warning(f"No se pudo verificar la sesión guardada de {colegio}; se sigue con ella.")
+            return True
+        if "login" in page.url or elemento.get_attribute("name") == "userId":
+            logger.info(f"Sesión guardada de {colegio} caducada, se inicia sesión de nuevo.")
+            return False
+        logger.info(f"Sesión guardada reutilizada para {colegio}.")
+        return True
+
+    def procesar_colegio(self, browser, posicion, colegio, usuario, contrasena, total_colegios):
+        """Inicia sesión y extrae los avances de un colegio en su propio contexto. Devuelve (datos, estudiantes_omitidos)."""
+        logger.info(f"Procesando colegio: {colegio}")
+
+        colegio_normalized = self.normalize_text(colegio)
+        colegios_especiales_normalized = [self.normalize_text(c) for c in COLEGIOS_ESPECIALES]
+        sesion = self.cache_sesiones.cargar(colegio, usuario) if self.cache_sesiones is not None else None
+        context = browser.new_context(
+            viewport={"width": 1920, "height": 1080}, no_viewport=False,
+            storage_state=sesion["estado"] if sesion else None
+        )
+        if self.politica_recursos is not None:
+            self.politica_recursos.aplicar(context)
+        page = context.new_page()
+        if self.politica_recursos is not None:
+            self.politica_recursos.aplicar_pagina(page)
+        captura_lista = CapturaRespuestas(page) if self.modo_extraccion == "red" else None
+
+        inicio_colegio = time.perf_counter()
+        try:
+            with self.metricas.medir("login", colegio):
+                if not (sesion and self.reutilizar_sesion(page, sesion, colegio)):
+                    if sesion:
+                        self.cache_sesiones.invalidar(colegio, usuario)
+                        # Con las cookies de la sesión descartada, /login podría redirigir antes de mostrar el formulario
+                        context.clear_cookies()
+                    self.iniciar_sesion(page, usuario, contrasena)
+                    if self.cache_sesiones is not None:
                         try:
-                            page.wait_for_load_state("networkidle", timeout=20000)
-                            if "login" in page.url:
-                                raise Exception("Fallo en el inicio de sesión.")
-                        except PlaywrightTimeoutError:
-                            raise Exception("No se pudo cargar la página después del login.")
+                            self.cache_sesiones.guardar(context, page.url, colegio, usuario)
+                        except Exception as e:
+                            logger.warning(f"No se pudo guardar la sesión de {colegio}: {str(e)}")
 
+            if colegio_normalized in colegios_especiales_normalized:
+                logger.info(f"Colegio especial {colegio}: Lista de estudiantes ya visible.")
+                try:
+                    page.wait_for_selector("a[href*='/students/']", timeout=30000)
+                except PlaywrightTimeoutError:
+                    logger.error(f"No se encontraron enlaces de estudiantes en {colegio}.")
+                    raise Exception("No se encontraron enlaces de estudiantes.")
+            else:
+                try:
+                    # Se espera a cualquiera de los enlaces posibles a la vez y luego se elige por preferencia,
+                    # en lugar de agotar el timeout de cada alternativa por turno
+                    selectores_enlace = SELECTORES_ENLACE_ESTUDIANTES
+                    try:
+                        page.wait_for_selector(", ".join(selectores_enlace), timeout=20000)
+                    except PlaywrightTimeoutError:
+                        logger.error(f"No se encontró enlace a estudiantes en {colegio}.")
+                        raise Exception("No se encontró el enlace a estudiantes.")
+                    estudiante_link = None
+                    for selector in selectores_enlace:
+                        estudiante_link = page.query_selector(selector)
+                        if estudiante_link:
+                            break
+                        logger.warning(f"Enlace '{selector}' no encontrado en {colegio}.")
+
+                    if estudiante_link:
+                        estudiante_link.click()
+                        page.wait_for_selector("a[href*='/students/']", timeout=20000)
+                    else:
+                        raise Exception("No se encontró enlace a estudiantes.")
+                except PlaywrightTimeoutError:
+                    logger.error(f"Timeout al buscar enlace a estudiantes en {colegio}.")
+                    raise Exception("No se encontró el enlace a estudiantes.")
+
+            total_estudiantes = 0
+            estudiantes_vistos = set()
+            estudiantes_data = []
+            huellas = {}  # url -> huella de la fila del estudiante en la lista
+
+            inicio_paginacion = time.perf_counter()
+            while True:
+                # Modo red: la página de la lista ya cargó los estudiantes en una respuesta JSON
+                estudiantes_red = []
+                if captura_lista is not None:
+                    for cuerpo in captura_lista.consumir(PATRON_URL_ESTUDIANTES):
+                        estudiantes_red.extend(estudiantes_en_json(cuerpo))
+                for nombre_aula, text, href, huella in estudiantes_red:
+                    if text.lower() != "añadir estudiante" and text not in estudiantes_vistos:
+                        estudiantes_vistos.add(text)
                         if colegio_normalized in colegios_especiales_normalized:
-                            logger.info(f"Colegio especial {colegio}: Lista de estudiantes ya visible.")
-                            page.wait_for_load_state("networkidle", timeout=30000)
-                            try:
-                                page.wait_for_selector("a[href*='/students/']", timeout=10000)
-                            except PlaywrightTimeoutError:
-                                logger.error(f"No se encontraron enlaces de estudiantes en {colegio}.")
-                                raise Exception("No se encontraron enlaces de estudiantes.")
-                        else:
-                            try:
-                                estudiante_link = None
-                                try:
-                                    estudiante_link = page.wait_for_selector("a[href='/schoolinfo/students']", timeout=20000)
-                                except PlaywrightTimeoutError:
-                                    logger.warning(f"Enlace 'a[href=/schoolinfo/students]' no encontrado en {colegio}.")
-                                    try:
-                                        estudiante_link = page.wait_for_selector("a:has-text('Estudiantes')", timeout=10000)
-                                    except PlaywrightTimeoutError:
-                                        try:
-                                            estudiante_link = page.wait_for_selector("a:has-text('Students')", timeout=10000)
-                                        except PlaywrightTimeoutError:
-                                            logger.error(f"No se encontró enlace a estudiantes en {colegio}.")
-                                            raise Exception("No se encontró el enlace a estudiantes.")
-
-                                if estudiante_link:
-                                    estudiante_link.click()
-                                    page.wait_for_load_state("networkidle", timeout=20000)
-                                else:
-                                    raise Exception("No se encontró enlace a estudiantes.")
-                            except PlaywrightTimeoutError:
-                                logger.error(f"Timeout al buscar enlace a estudiantes en {colegio}.")
-                                raise Exception("No se encontró el enlace a estudiantes.")
-
-                        total_estudiantes = 0
-                        estudiantes_vistos = set()
-                        estudiantes_data = []
+                            nombre_aula = GRUPO_MAPPING.get(colegio, "Desconocida")
+                        logger.debug(f"Estudiante: {text}, Aula: {nombre_aula} en {colegio} (red)")
+                        estudiantes_data.append((nombre_aula, text, urljoin(BASE_URL, href)))
+                        huellas[urljoin(BASE_URL, href)] = huella
+                        total_estudiantes += 1
+
+                if estudiantes_red:
+                    estudiantes = []
+                else:
+                    # Una sola llamada a evaluate trae (texto, href, aula) de todos los enlaces de la página
+                    estudiantes = page.evaluate(SCRIPT_LISTA_ESTUDIANTES)
+                    logger.info(f"Encontrados {len(estudiantes)} enlaces de estudiantes en esta página para {colegio}")
+                for text, href, aula_texto, fila_texto in estudiantes:
+                    text = (text or "").strip()
+                    if text.lower() != "añadir estudiante" and text not in estudiantes_vistos:
+                        estudiantes_vistos.add(text)
+                        if href and not href.startswith("log:"):
+                            full_url = urljoin(BASE_URL, href)
+                            if colegio_normalized in colegios_especiales_normalized:
+                                nombre_aula = GRUPO_MAPPING.get(colegio, "Desconocida")
+                            else:
+                                nombre_aula = aula_texto.strip() if aula_texto is not None else "Desconocida"
+                            logger.debug(f"Estudiante: {text}, Aula: {nombre_aula} en {colegio}")
+                            estudiantes_data.append((nombre_aula, text, full_url))
+                            huellas[full_url] = huella_fila(fila_texto or text)
+                            total_estudiantes += 1
+                logger.info(f"Total de estudiantes contados hasta ahora en {colegio}: {total_estudiantes}")
 
+                try:
+                    siguiente_boton = page.query_selector("button[aria-label*='next page']")
+                    if siguiente_boton and "Mui-disabled" in (siguiente_boton.get_attribute("class") or ""):
+                        break
+                    if siguiente_boton:
+                        # Esperar a que cambien los enlaces de la tabla en lugar de networkidle
+                        firma_anterior = page.evaluate(SCRIPT_FIRMA_LISTA)
+                        with self.espera("cambio_pagina", colegio) as timeout:
+                            siguiente_boton.click()
+                            page.wait_for_function(
+                                f"(anterior) => {{ const actual = ({SCRIPT_FIRMA_LISTA})(); return actual !== '' && actual !== anterior; }}",
+                                arg=firma_anterior,
+                                timeout=timeout
+                            )
+                    else:
+                        break
+                except PlaywrightTimeoutError:
+                    logger.warning(f"No se pudo avanzar a la siguiente página en {colegio}")
+                    break
+
+            self.metricas.registrar("paginacion", time.perf_counter() - inicio_paginacion, colegio)
+            self.ajustar_progreso(maximo=total_estudiantes - 100)
+
+            def reautenticar():
+                # Sin cookies, /login muestra el formulario aunque la sesión anterior siguiera viva
+                context.clear_cookies()
+                self.iniciar_sesion(page, usuario, contrasena)
+                if self.cache_sesiones is not None:
+                    try:
+                        self.cache_sesiones.guardar(context, page.url, colegio, usuario)
+                    except Exception as e:
+                        logger.warning(f"No se pudo guardar la sesión de {colegio}: {str(e)}")
+
+            # Procesa los datos de cada estudiante con un pool de páginas
+            df_datos, estudiantes_omitidos = self.procesar_estudiantes(
+                context, estudiantes_data, colegio, posicion, total_colegios, reautenticar=reautenticar, huellas=huellas
+            )
+            self.metricas.colegio_terminado(colegio, time.perf_counter() - inicio_colegio, total_estudiantes)
+            logger.info(f"Timeouts adaptativos de {colegio} (ms): {self.tiempos_colegio(colegio).resumen()}")
+            return df_datos, estudiantes_omitidos
+        finally:
+            context.close()
+
+    def procesar_colegios_concurrente(self, colegios, total_colegios, al_terminar=None):
+        """Extrae los colegios en el daemon de navegadores si está activo y USAR_DAEMON lo pide; si no, lanza
+        navegadores locales (procesar_colegios_locales). Devuelve {posicion: (colegio, df_datos, estudiantes_omitidos, error)}."""
+        cliente = ClienteDaemon.disponible() if USAR_DAEMON else None
+        if cliente is None:
+            if USAR_DAEMON:
+                logger.info("El daemon de navegadores no está activo, se lanza un navegador local.")
+            return self.procesar_colegios_locales(colegios, total_colegios, al_terminar)
+        return self.procesar_colegios_daemon(cliente, colegios, total_colegios, al_terminar)
+
+    def procesar_colegios_daemon(self, cliente, colegios, total_colegios, al_terminar=None):
+        """Envía los colegios al daemon y procesa sus eventos a medida que llegan: guarda cada estudiante en el
+        almacén, actualiza el progreso y entrega cada colegio terminado. Los colegios sin respuesta (p. ej. si
+        se corta la conexión) se procesan con navegadores locales."""
+        por_posicion = {posicion: colegio for posicion, colegio, _, _ in colegios}
+        guardados, anteriores = {}, {}
+        if self.almacen is not None:
+            for posicion, colegio in por_posicion.items():
+                guardados_colegio = self.almacen.estudiantes_guardados(self.run_id, colegio)
+                if guardados_colegio:
+                    guardados[str(posicion)] = guardados_colegio
+                anteriores_colegio = self.estudiantes_anteriores(colegio)
+                if anteriores_colegio:
+                    anteriores[str(posicion)] = anteriores_colegio
+        resultados = {}
+        logger.info(f"Procesando {len(colegios)} colegio(s) en el daemon de navegadores ({cliente.host}:{cliente.puerto}).")
+        try:
+            ajustes = {"paginas": self.paginas_por_colegio, "modo": self.modo_extraccion}
+            for evento in cliente.extraer([list(c) for c in colegios], total_colegios, guardados, anteriores, ajustes):
+                tipo = evento.get("tipo")
+                posicion = evento.get("posicion")
+                if tipo == "progreso":
+                    if evento["maximo"]:
+                        self.ajustar_progreso(maximo=evento["maximo"])
+                    for _ in range(evento["valor"]):
+                        self.estudiante_procesado(posicion, total_colegios)
+                elif tipo == "estudiante" and self.almacen is not None:
+                    self.almacen.guardar_estudiante(
+                        self.run_id, por_posicion[posicion], evento["url"], evento["orden"], evento["nombre"],
+                        [tuple(fila) for fila in evento["filas"]], evento["omitido"], evento.get("huella"), evento.get("copias", 0)
+                    )
+                elif tipo == "colegio":
+                    colegio, error, df_datos = por_posicion[posicion], evento["error"], None
+                    # Las mediciones por fase del daemon se suman a las de esta ejecución (se exportan con --metricas)
+                    self.metricas.combinar(evento.get("metricas", {}), colegio)
+                    if error is None:
+                        acumulador = AcumuladorFilas()
+                        acumulador.agregar(0, evento["filas"])
+                        df_datos = acumulador.a_dataframe()
+                    else:
+                        logger.error(f"Error general en {colegio}: {error}")
+                        self.show_error("Error", f"Error en {colegio}: {error}")
+                    if self.almacen is not None:
+                        self.almacen.marcar_colegio(self.run_id, colegio, posicion, error)
+                    if al_terminar is not None:
+                        al_terminar(posicion, colegio, df_datos)
+                        df_datos = None
+                    resultados[posicion] = (colegio, df_datos, evento["omitidos"], error)
+        except (OSError, ValueError) as e:
+            logger.error(f"Se perdió la conexión con el daemon de navegadores: {str(e)}")
+
+        pendientes = [c for c in colegios if c[0] not in resultados]
+        if pendientes:
+            logger.warning(f"{len(pendientes)} colegio(s) sin respuesta del daemon, se procesan con un navegador local.")
+            resultados.update(self.procesar_colegios_locales(pendientes, total_colegios, al_terminar))
+        return resultados
+
+    def procesar_colegios_locales(self, colegios, total_colegios, al_terminar=None):
+        """Procesa los colegios con un pool acotado de hilos. Cada hilo lanza su propio navegador
+        (la API síncrona de Playwright no se comparte entre hilos) y crea un contexto por colegio.
+        Devuelve {posicion: (colegio, df_datos, estudiantes_omitidos, error)}.
+
+        Si se pasa `al_terminar(posicion, colegio, df_datos)`, se llama en cuanto termina cada colegio
+        (df_datos None si falló) y el DataFrame no se guarda en el resultado."""
+        cola = queue.Queue()
+        for item in colegios:
+            cola.put(item)
+        resultados = {}
+        lock_resultados = threading.Lock()
+
+        def trabajador():
+            try:
+                with sync_playwright() as p:
+                    browser = p.chromium.launch(headless=True)
+                    try:
                         while True:
-                            estudiantes = page.query_selector_all("a[href*='/students/']")
-                            logger.info(f"Encontrados {len(estudiantes)} enlaces de estudiantes en esta página para {colegio}")
-                            for e in estudiantes:
-                                text = e.text_content().strip()
-                                if text.lower() != "añadir estudiante" and text not in estudiantes_vistos:
-                                    estudiantes_vistos.add(text)
-                                    href = e.get_attribute("href")
-                                    if href and not href.startswith("log:"):
-                                        full_url = urljoin(BASE_URL, href)
-                                        row = e.query_selector("xpath=ancestor::tr")
-                                        aula_cell = row.query_selector("td:nth-child(2)") if row else None
-                                        if colegio_normalized in colegios_especiales_normalized:
-                                            nombre_aula = grupo_mapping.get(colegio, "Desconocida")
-                                        else:
-                                            nombre_aula = aula_cell.text_content().strip() if aula_cell else "Desconocida"
-                                        logger.info(f"Estudiante: {text}, Aula: {nombre_aula} en {colegio}")
-                                        estudiantes_data.append((nombre_aula, text, full_url))
-                                        total_estudiantes += 1
-                            logger.info(f"Total de estudiantes contados hasta ahora en {colegio}: {total_estudiantes}")
-
                             try:
-                                siguiente_boton = page.query_selector("button[aria-label*='next page']")
-                                if siguiente_boton and "Mui-disabled" in (siguiente_boton.get_attribute("class") or ""):
-                                    break
-                                if siguiente_boton:
-                                    siguiente_boton.click()
-                                    page.wait_for_load_state("networkidle", timeout=15000)
-                                    page.wait_for_selector("a[href*='/students/']", timeout=15000)
-                                else:
-                                    break
-                            except PlaywrightTimeoutError:
-                                logger.warning(f"No se pudo avanzar a la siguiente página en {colegio}")
+                                posicion, colegio, usuario, contrasena = cola.get_nowait()
+                            except queue.Empty:
                                 break
+                            try:
+                                df_datos, omitidos = self.procesar_colegio(browser, posicion, colegio, usuario, contrasena, total_colegios)
+                                resultado = (colegio, df_datos, omitidos, None)
+                            except Exception as e:
+                                logger.error(f"Error general en {colegio}: {str(e)}")
+                                self.show_error("Error", f"Error en {colegio}: {str(e)}")
+                                resultado = (colegio, None, [], str(e))
+                            if self.almacen is not None:
+                                self.almacen.marcar_colegio(self.run_id, colegio, posicion, resultado[3])
+                            if al_terminar is not None:
+                                al_terminar(posicion, colegio, resultado[1])
+                                resultado = (colegio, None, resultado[2], resultado[3])
+                            with lock_resultados:
+                                resultados[posicion] = resultado
+                    finally:
+                        browser.close()
+            except Exception as e:
+                logger.error(f"Error al iniciar el navegador en un hilo de trabajo: {str(e)}")
+
+        num_hilos = min(MAX_COLEGIOS_CONCURRENTES, len(colegios))
+        logger.info(f"Procesando colegios con {num_hilos} hilo(s) concurrentes.")
+        hilos = [threading.Thread(target=trabajador, name=f"colegio-{i}") for i in range(num_hilos)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        # Los colegios que ningún hilo llegó a procesar se registran como error
+        for posicion, colegio, _, _ in colegios:
+            if posicion not in resultados:
+                logger.error(f"Error general en {colegio}: no se pudo procesar")
+                resultados[posicion] = (colegio, None, [], "No se pudo procesar")
+                if al_terminar is not None:
+                    al_terminar(posicion, colegio, None)
+        return resultados
+
+    def escribir_asignacion(self, num_shards, ruta):
+        """Reparte los colegios en `num_shards` shards según el historial local y guarda la asignación en `ruta`,
+        para copiarla a las máquinas de los shards (--shard i/N --asignacion RUTA). Devuelve un código SALIDA_*."""
+        colegios = self.leer_credenciales()
+        if colegios is None:
+            return SALIDA_ERROR
+        historial = HistorialAvances(RUTA_HISTORIAL)
+        try:
+            pesos = historial.estudiantes_por_colegio()
+        finally:
+            historial.cerrar()
+        asignacion = asignar_shards([colegio for _, colegio, _, _ in colegios], num_shards, pesos)
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump({"num_shards": num_shards, "colegios": {str(c): s for c, s in asignacion.items()}},
+                      f, ensure_ascii=False, indent=1, sort_keys=True)
+        for shard in range(num_shards):
+            propios = [str(c) for c, s in asignacion.items() if s == shard]
+            logger.info(f"Shard {shard + 1}/{num_shards}: {len(propios)} colegios "
+                        f"({sum(pesos.get(c, 0) for c in propios)} estudiantes en la ejecución anterior)")
+        logger.info(f"Asignación de {len(asignacion)} colegios en {num_shards} shards guardada en {ruta}")
+        return SALIDA_OK
+
+    def procesar_shard(self, indice, num_shards, ruta_parcial, ruta_asignacion=None):
+        """Extrae solo los colegios del shard `indice` (1..num_shards) y los guarda en el almacén `ruta_parcial`,
+        sin generar reporte ni gráficos (eso lo hace procesar_colegios(parciales=...)). La asignación se lee de
+        `ruta_asignacion` (escrita por escribir_asignacion); sin ella se reparte sin pesos, que da lo mismo en
+        todas las máquinas pero no equilibra por estudiantes. Devuelve un código SALIDA_*."""
+        start_time = time.time()
+        try:
+            colegios = self.leer_credenciales()
+            if colegios is None:
+                return SALIDA_ERROR
+            self.metricas = MetricasEjecucion()
+            self.tiempos = {}
+
+            # Todos los shards deben usar la misma asignación: la del archivo compartido o, sin él, una sin pesos
+            # (el historial local de cada máquina puede ser distinto)
+            nombres = [colegio for _, colegio, _, _ in colegios]
+            if ruta_asignacion:
+                asignacion = leer_asignacion(ruta_asignacion, nombres, num_shards)
+            else:
+                logger.warning(f"Shard {indice}/{num_shards} sin --asignacion: se reparte sin equilibrar por estudiantes.")
+                asignacion = {str(c): s for c, s in asignar_shards(nombres, num_shards).items()}
+            propios = [c for c in colegios if asignacion[str(c[1])] == indice - 1]
+            logger.info(f"Shard {indice}/{num_shards}: {len(propios)} de {len(colegios)} colegios")
+
+            if BLOQUEAR_RECURSOS:
+                self.politica_recursos = PoliticaRecursos(TIPOS_RECURSO_BLOQUEADOS, HOSTS_BLOQUEADOS, HOSTS_PERMITIDOS)
+            self.almacen = AlmacenResultados(ruta_parcial)
+            self.run_id = self.almacen.ultima_ejecucion_incompleta() if self.reanudar else None
+            if self.run_id:
+                logger.info(f"Reanudando la ejecución {self.run_id} desde {ruta_parcial}")
+            else:
+                self.run_id = self.almacen.nueva_ejecucion()
+            self.almacen.guardar_shard(self.run_id, indice, num_shards, asignacion)
+
+            completos = self.almacen.colegios_completos(self.run_id)
+            pendientes = [c for c in propios if c[1] not in completos]
+            resultados = {}
+            if pendientes:
+                # Las filas ya quedan en el almacén parcial; no hace falta conservar los DataFrames
+                resultados = self.procesar_colegios_concurrente(pendientes, len(colegios), al_terminar=lambda *_: None)
+            if self.politica_recursos is not None:
+                logger.info(f"Recursos: {self.politica_recursos.resumen()}")
+            self.almacen.finalizar_ejecucion(self.run_id)
+
+            errores = [colegio for colegio, _, _, error in resultados.values() if error is not None]
+            omitidos = sum(len(omitidos) for _, _, omitidos, _ in resultados.values())
+            logger.info(f"Shard {indice}/{num_shards} guardado en {ruta_parcial}. Colegios con error: {errores or 'ninguno'}. "
+                        f"Tiempo total: {time.time() - start_time} segundos")
+            self.metricas.registrar_lentos(TOP_LENTOS)
+            if propios and len(errores) == len(pendientes) == len(propios):
+                return SALIDA_ERROR
+            return SALIDA_PARCIAL if errores or omitidos else SALIDA_OK
+        except Exception as e:
+            logger.error(f"Error en el shard {indice}/{num_shards}: {str(e)}")
+            return SALIDA_ERROR
+        finally:
+            if self.ruta_metricas and self.metricas.fases:
+                try:
+                    self.metricas.exportar(self.ruta_metricas, TOP_LENTOS)
+                except OSError as e:
+                    logger.warning(f"No se pudieron exportar las métricas a {self.ruta_metricas}: {str(e)}")
+            if self.almacen is not None:
+                self.almacen.cerrar()
+                self.almacen = None
+
+    def resultados_parciales(self, colegios, rutas, escritor):
+        """Envía al escritor los colegios guardados en los almacenes parciales de los shards, en el orden de
+        las credenciales. Si un colegio aparece en varios archivos se usa el primero de `rutas`.
+        Lanza una excepción si los parciales no son de la misma asignación o no cubren todos los colegios
+        (validar_parciales). Devuelve {posicion: (colegio, None, estudiantes_omitidos, error)}."""
+        almacenes = []
+        fuentes = []  # (ruta, almacen, run_id, colegios completos, {colegio: error})
+        try:
+            for ruta in rutas:
+                if not os.path.exists(ruta):
+                    logger.warning(f"No se encontró el archivo parcial {ruta}, se ignora.")
+                    continue
+                almacen = AlmacenResultados(ruta)
+                almacenes.append(almacen)
+                run_id = almacen.ultima_ejecucion()
+                fuentes.append((ruta, almacen, run_id, almacen.colegios_completos(run_id), almacen.errores_colegios(run_id)))
+            validar_parciales(colegios, [(ruta, almacen.shard(run_id)) for ruta, almacen, run_id, _, _ in fuentes])
+
+            resultados = {}
+            for posicion, colegio, _, _ in colegios:
+                con_datos = [fuente for fuente in fuentes if colegio in fuente[3]]
+                if len(con_datos) > 1:
+                    logger.warning(f"{colegio} está en varios archivos parciales, se usa {con_datos[0][0]}")
+                if con_datos:
+                    ruta, almacen, run_id, _, _ = con_datos[0]
+                    df_datos, omitidos = almacen.resultado_colegio(run_id, colegio)
+                    escritor.enviar(posicion, colegio, df_datos)
+                    resultados[posicion] = (colegio, None, omitidos, None)
+                    num_estudiantes = df_datos["Estudiante"].nunique()
+                    self.ajustar_progreso(maximo=num_estudiantes - 100, valor=num_estudiantes)
+                    logger.info(f"{colegio} leído de {ruta}")
+                    continue
+                error = next((fuente[4][colegio] for fuente in fuentes if colegio in fuente[4]), None)
+                error = error or "Sin resultado en los archivos parciales"
+                logger.error(f"Error general en {colegio}: {error}")
+                escritor.enviar(posicion, colegio, None)
+                resultados[posicion] = (colegio, None, [], error)
+            return resultados
+        finally:
+            for almacen in almacenes:
+                almacen.cerrar()
+
+    def hojas_reporte_anterior(self):
+        """Lee una sola vez reporte_anterior.xlsx; solo se usa para colegios que aún no tienen historial."""
+        if self._hojas_anteriores is None:
+            self._hojas_anteriores = {}
+            if os.path.exists(self.ruta_reporte_anterior):
+                try:
+                    self._hojas_anteriores = pd.read_excel(self.ruta_reporte_anterior, sheet_name=None)
+                except Exception as e:
+                    logger.warning(f"Error al leer {self.ruta_reporte_anterior}: {str(e)}. Se ignorará.")
+                    os.remove(self.ruta_reporte_anterior)
+        return self._hojas_anteriores
+
+    def progreso_anterior(self, colegio):
+        """Progreso con el que se compara el colegio: historial (ejecución anterior o QUREO_COMPARAR_DESDE)
+        y, si no hay historial, la hoja del colegio en reporte_anterior.xlsx."""
+        hasta_ts = fecha_a_ts(self.comparar_desde, fin_del_dia=True) if self.comparar_desde else None
+        df_prev = self.historial.instantanea(colegio, excluir_run_id=self.run_id, hasta_ts=hasta_ts)
+        if df_prev is not None:
+            return df_prev
+        # Las hojas se escriben con el nombre truncado, así que se buscan por ese nombre
+        hoja = self.hojas_reporte_anterior().get(self.truncate_sheet_name(colegio))
+        return hoja_anterior_a_previa(hoja) if hoja is not None else None
+
+    def especificacion_grafico_aula(self, colegio, plat_name, df_plataforma):
+        """Datos agregados del gráfico de avance promedio por aula de un colegio y plataforma."""
+        resumen_por_aula = df_plataforma.groupby("Aula", observed=True)["Capítulos completados"].mean()
+        return {
+            "tipo": "aula",
+            "ruta": os.path.join(self.directorio_graficos, f"avance_{self.truncate_sheet_name(colegio)}_{self.truncate_sheet_name(plat_name)}.png"),
+            "titulo": f"Avance Promedio por Aula en {colegio} ({plat_name})",
+            "aulas": [str(aula) for aula in resumen_por_aula.index],
+            "valores": [float(v) for v in resumen_por_aula.values]
+        }
 
-                        self.progress["maximum"] = self.progress["maximum"] + total_estudiantes - 100
+    def generar_graficos(self, graficos):
+        """Genera un gráfico por colegio y plataforma y el gráfico global a partir de los datos agregados que
+        deja EscritorReporte: [(colegio, especificaciones por aula, avance Qureo, avance JavaScript)].
+
+        Solo se vuelven a dibujar los gráficos cuyos datos agregados cambiaron desde la ejecución anterior
+        (caché de hashes en la carpeta de gráficos); el resto se dibuja en un pool de procesos."""
+        os.makedirs(self.directorio_graficos, exist_ok=True)
+        especificaciones = [especificacion for _, especificaciones_aula, _, _ in graficos for especificacion in especificaciones_aula]
+        especificaciones.append({
+            "tipo": "global",
+            "ruta": os.path.join(self.directorio_graficos, "avance_global.png"),
+            "colegios": [str(colegio) for colegio, _, _, _ in graficos],
+            "qureo": [avance_qureo for _, _, avance_qureo, _ in graficos],
+            "js": [avance_js for _, _, _, avance_js in graficos]
+        })
+
+        # Caché por contenido: hash de los datos de entrada de cada gráfico
+        ruta_cache = os.path.join(self.directorio_graficos, ARCHIVO_CACHE_GRAFICOS)
+        try:
+            with open(ruta_cache, encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        pendientes = []
+        for especificacion in especificaciones:
+            huella = hashlib.sha256(json.dumps(especificacion, sort_keys=True).encode("utf-8")).hexdigest()
+            if cache.get(especificacion["ruta"]) == huella and os.path.exists(especificacion["ruta"]):
+                logger.info(f"Gráfico sin cambios, se conserva: {especificacion['ruta']}")
+                continue
+            pendientes.append((especificacion, huella))
+
+        num_procesos = min(MAX_PROCESOS_GRAFICOS, len(pendientes) // MIN_GRAFICOS_POR_PROCESO)
+        if num_procesos > 1:
+            rutas = renderizar_en_procesos([e for e, _ in pendientes], num_procesos)
+        else:
+            rutas = [renderizar_grafico(e) for e, _ in pendientes]
+        for ruta, (_, huella) in zip(rutas, pendientes):
+            cache[ruta] = huella
+            logger.info(f"Gráfico generado: {ruta}")
+
+        with open(ruta_cache, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=1, sort_keys=True)
+
+    def leer_credenciales(self):
+        """Lee el archivo de credenciales. Devuelve [(posicion, colegio, usuario, contraseña)], o None si el
+        archivo no es válido (el error ya se mostró)."""
+        credenciales_df = pd.read_excel(self.ruta_credenciales, sheet_name=0)
+        required_columns = ["Colegio", "Usuario", "Contraseña"]
+        if not all(col in credenciales_df.columns for col in required_columns):
+            missing_cols = [col for col in required_columns if col not in credenciales_df.columns]
+            self.show_error("Error", f"El archivo XLSX no contiene las columnas requeridas: {', '.join(missing_cols)}")
+            self.update_gui("Error en el archivo XLSX")
+            return None
+
+        if credenciales_df[required_columns].isna().any().any():
+            self.show_error("Error", f"El archivo '{self.ruta_credenciales}' contiene valores vacíos o NaN en las columnas Colegio, Usuario o Contraseña.")
+            self.update_gui("Error: Valores inválidos en el archivo XLSX")
+            return None
+
+        credenciales_df = credenciales_df.dropna(subset=required_columns)
+        if len(credenciales_df) == 0:
+            self.show_error("Error", f"No hay colegios válidos en '{self.ruta_credenciales}'.")
+            self.update_gui("Error: No hay colegios válidos")
+            return None
+
+        return [
+            (posicion, row["Colegio"], row["Usuario"], row["Contraseña"])
+            for posicion, (_, row) in enumerate(credenciales_df.iterrows())
+        ]
 
-                        # Procesa los datos de cada estudiante (optimizado)
-                        for nombre_aula, nombre, url in estudiantes_data:
-                            if "-" in nombre_aula:
-                                try:
-                                    grado, seccion = nombre_aula.split("-", 1)[:2]
-                                except ValueError:
-                                    logger.warning(f"Formato de aula inválido: {nombre_aula} en {colegio}")
-                                    grado, seccion = "Desconocido", "Desconocida"
-                            else:
-                                logger.warning(f"Aula sin guion: {nombre_aula} en {colegio}")
-                                grado, seccion = "Desconocido", "Desconocida"
-
-                            new_page = context.new_page()
-                            success = False
-                            for attempt in range(2):  # Reducir a 2 intentos
-                                try:
-                                    logger.info(f"Intento {attempt + 1} para estudiante {nombre} en aula {nombre_aula} ({colegio})")
-                                    new_page.goto(url, timeout=12000)  # Reducir timeout
-                                    new_page.wait_for_load_state("domcontentloaded", timeout=12000)  # Usar domcontentloaded
-
-                                    # Esperar explícitamente a que los acordeones estén presentes
-                                    try:
-                                        new_page.wait_for_selector(
-                                            "//div[contains(@class,'MuiAccordionSummary-root') and .//h3]", 
-                                            state="visible", 
-                                            timeout=8000  # Reducir timeout
-                                        )
-                                    except PlaywrightTimeoutError:
-                                        logger.warning(f"No se encontraron acordeones válidos para {nombre} en aula {nombre_aula} ({colegio})")
-                                        raise Exception("No se encontraron acordeones válidos")
-
-                                    # Obtener acordeones y filtrar títulos relevantes de una vez
-                                    acordeones = new_page.query_selector_all("//div[contains(@class,'MuiAccordionSummary-root') and .//h3]")
-                                    logger.info(f"Estudiante {nombre} en aula {nombre_aula} ({colegio}): Encontrados {len(acordeones)} acordeones")
-
-                                    # Cachear títulos de acordeones para evitar consultas repetidas
-                                    titulos_acordeones = []
-                                    for i, acordeon in enumerate(acordeones, 1):
-                                        h3_element = acordeon.query_selector("xpath=.//h3")
-                                        titulo = h3_element.text_content().strip() if h3_element else "Curso sin título"
-                                        titulos_acordeones.append((acordeon, titulo))
-                                        logger.info(f"Acordeón {i}: {titulo}")
-
-                                    cursos_encontrados = False
-                                    cursos_validos = []
-                                    for i, (acordeon, titulo) in enumerate(titulos_acordeones, 1):
-                                        # Filtrar cursos no relevantes primero
-                                        if not any(keyword in titulo.lower() for keyword in ["principiante", "javascript", "beginner", "js", "básico", "intro"]):
-                                            logger.info(f"Curso {titulo} descartado para {nombre} en aula {nombre_aula} ({colegio})")
-                                            continue
-
-                                        # Evitar procesar cursos duplicados
-                                        if titulo in cursos_validos:
-                                            logger.warning(f"Curso {titulo} ya procesado para {nombre} en aula {nombre_aula} ({colegio}), omitiendo")
-                                            continue
-
-                                        try:
-                                            # Verificar visibilidad
-                                            if not acordeon.is_visible():
-                                                logger.warning(f"Acordeón {i} no visible para {nombre} en aula {nombre_aula} ({colegio})")
-                                                continue
-
-                                            # Expandir acordeón si está colapsado
-                                            if acordeon.get_attribute("aria-expanded") == "false":
-                                                try:
-                                                    acordeon.scroll_into_view_if_needed(timeout=4000)
-                                                    acordeon.click(timeout=4000)
-                                                    new_page.wait_for_timeout(700)  # Reducir espera
-                                                except Exception as e:
-                                                    logger.warning(f"Error al expandir acordeón {titulo} para {nombre} en aula {nombre_aula} ({colegio}): {str(e)}")
-                                                    continue
-
-                                            # Obtener contenedor y progreso
-                                            contenedor = acordeon.query_selector("xpath=./ancestor::div[contains(@class, 'MuiAccordion-root')]")
-                                            if not contenedor:
-                                                logger.warning(f"No se encontró contenedor para {titulo}")
-                                                progreso_texto = "0"
-                                            else:
-                                                progreso = contenedor.query_selector(
-                                                    "xpath=.//div[contains(text(),'finalizados') or contains(text(),'completed')]/following-sibling::div"
-                                                )
-                                                progreso_texto = progreso.text_content().strip() if progreso else "0"
-                                                logger.info(f"Progreso en {titulo}: {progreso_texto}")
-
-                                            datos.append({
-                                                "Aula": nombre_aula,
-                                                "Grado": grado,
-                                                "Sección": seccion,
-                                                "Estudiante": nombre,
-                                                "Curso": titulo,
-                                                "Capítulos finalizados": progreso_texto
-                                            })
-                                            cursos_validos.append(titulo)
-                                            cursos_encontrados = True
-
-                                        except Exception as e:
-                                            logger.error(f"Error al procesar curso {titulo}: {str(e)}")
-                                            continue
-
-                                    # Registrar cursos faltantes
-                                    if not cursos_encontrados or len(cursos_validos) < 2:
-                                        logger.info(f"Sin cursos válidos suficientes, registrando ambos cursos")
-                                        for curso in ["Curso para principiantes", "Curso de JavaScript"]:
-                                            if curso not in cursos_validos:
-                                                datos.append({
-                                                    "Aula": nombre_aula,
-                                                    "Grado": grado,
-                                                    "Sección": seccion,
-                                                    "Estudiante": nombre,
-                                                    "Curso": curso,
-                                                    "Capítulos finalizados": "0"
-                                                })
-                                                logger.info(f"Registrado {curso} con 0 capítulos finalizados")
-                                        cursos_encontrados = True
-
-                                    if cursos_encontrados:
-                                        success = True
-                                        break
-                                    else:
-                                        logger.warning(f"No se encontraron cursos válidos, reintentando...")
-                                        time.sleep(1)  # Reducir espera
-
-                                except Exception as e:
-                                    logger.error(f"Intento {attempt + 1} fallido para estudiante {nombre} en aula {nombre_aula} ({colegio}): {str(e)}")
-                                    if attempt < 1:  # Solo reintentar una vez
-                                        time.sleep(1)
-                                    continue
-
-                            if not success:
-                                logger.error(f"Fallo tras reintentos, estudiante {nombre} omitido")
-                                estudiantes_omitidos.append(nombre)
-                                datos.append({
-                                    "Aula": nombre_aula,
-                                    "Grado": grado,
-                                    "Sección": seccion,
-                                    "Estudiante": nombre,
-                                    "Curso": "Error",
-                                    "Capítulos finalizados": "0"
-                                })
-
-                            new_page.close()
-                            self.master.after(0, lambda: self.progress.__setitem__("value", self.progress["value"] + 1))
-                            if self.progress["value"] % 10 == 0:
-                                self.update_gui(f"Procesado {self.progress['value']} estudiantes (colegio {idx+1}/{total_colegios})")
-
-                        datos_por_colegio[colegio] = pd.DataFrame(datos)
-                        estudiantes_omitidos_global.extend([f"{nombre} ({colegio})" for nombre in estudiantes_omitidos])
+    def procesar_colegios(self, parciales=None):
+        """Ejecuta el proceso completo (extracción, reporte y gráficos). Devuelve un código SALIDA_*.
 
-                    except Exception as e:
-                        logger.error(f"Error general en {colegio}: {str(e)}")
-                        self.show_error("Error", f"Error en {colegio}: {str(e)}")
-                        colegios_con_errores.append(colegio)
-                    finally:
-                        context.close()
+        Con `parciales` (rutas de almacenes escritos por procesar_shard) no se abre el navegador: los colegios
+        se leen de esos archivos y se genera el mismo reporte y gráficos que en una ejecución única."""
+        start_time = time.time()
+        colegios_con_datos = []
+        estudiantes_omitidos_global = []
+        colegios_con_errores = []
 
-                browser.close()
+        try:
+            colegios = self.leer_credenciales()
+            if colegios is None:
+                self.habilitar_botones()
+                return SALIDA_ERROR
+            total_colegios = len(colegios)
 
-            if datos_por_colegio:
+            logger.info(f"Procesando {total_colegios} colegios.")
+            self.metricas = MetricasEjecucion()
+            self.tiempos = {}
+
+            self._hojas_anteriores = None
+            self.historial = HistorialAvances(RUTA_HISTORIAL)
+
+            if self.master is not None:
+                self.eventos.reiniciar_progreso(total_colegios * 100)
+            self._estudiantes_procesados = 0
+            if BLOQUEAR_RECURSOS:
+                self.politica_recursos = PoliticaRecursos(TIPOS_RECURSO_BLOQUEADOS, HOSTS_BLOQUEADOS, HOSTS_PERMITIDOS)
+
+            self.almacen = AlmacenResultados(RUTA_ALMACEN)
+            self.run_id = self.almacen.ultima_ejecucion_incompleta() if self.reanudar and parciales is None else None
+            if self.run_id:
+                logger.info(f"Reanudando la ejecución {self.run_id} desde {RUTA_ALMACEN}")
+            else:
+                self.run_id = self.almacen.nueva_ejecucion()
+
+            # El reporte se escribe en segundo plano a medida que terminan los colegios
+            # Los colegios que terminan antes de su turno se releen del almacén en lugar de esperar en memoria
+            # (los de los parciales se envían ya en orden y no están en self.almacen)
+            def cargar(colegio):
+                return self.almacen.resultado_colegio(self.run_id, colegio)[0]
+            escritor = EscritorReporte(self, self.ruta_reporte, cargar=cargar if parciales is None else None)
+
+            resultados = {}
+            if parciales is not None:
+                resultados = self.resultados_parciales(colegios, parciales, escritor)
+            else:
+                # Los colegios completados en la ejecución interrumpida se leen del almacén sin abrir el navegador
+                completos = self.almacen.colegios_completos(self.run_id)
+                for posicion, colegio, _, _ in colegios:
+                    if colegio in completos:
+                        df_datos, omitidos = self.almacen.resultado_colegio(self.run_id, colegio)
+                        escritor.enviar(posicion, colegio, df_datos)
+                        resultados[posicion] = (colegio, None, omitidos, None)
+                        num_estudiantes = df_datos["Estudiante"].nunique()
+                        self.ajustar_progreso(maximo=num_estudiantes - 100, valor=num_estudiantes)
+                        logger.info(f"{colegio} ya estaba completo en la ejecución {self.run_id}, se lee del almacén")
+                pendientes = [c for c in colegios if c[0] not in resultados]
+                if pendientes:
+                    resultados.update(self.procesar_colegios_concurrente(pendientes, total_colegios, al_terminar=escritor.enviar))
+            if self.politica_recursos is not None:
+                logger.info(f"Recursos: {self.politica_recursos.resumen()}")
+
+            # Reunir resultados en el orden del archivo de credenciales, igual que una ejecución secuencial
+            for posicion in sorted(resultados):
+                colegio, _, omitidos, error = resultados[posicion]
+                if error is not None:
+                    colegios_con_errores.append(colegio)
+                    continue
+                colegios_con_datos.append(colegio)
+                estudiantes_omitidos_global.extend([f"{nombre} ({colegio})" for nombre in omitidos])
+
+            if colegios_con_datos:
                 try:
-                    with pd.ExcelWriter("reporte_avances.xlsx", engine='xlsxwriter') as writer_avances:
-                        for colegio, df_actual in datos_por_colegio.items():
-                            sheet_name = self.truncate_sheet_name(colegio)
-                            def parse_capitulos(caps):
-                                try:
-                                    if "/" in str(caps):
-                                        completados, total = map(int, caps.split("/"))
-                                        return completados, total
-                                    return 0, 0
-                                except:
-                                    return 0, 0
-
-                            df_actual[["Capítulos completados", "Total capítulos"]] = df_actual["Capítulos finalizados"].apply(parse_capitulos).apply(pd.Series)
-                            if colegio in df_anterior:
-                                df_prev = df_anterior.get(colegio, pd.DataFrame())
-                                df_prev[["Capítulos completados_prev", "Total capítulos_prev"]] = df_prev["Capítulos finalizados"].apply(parse_capitulos).apply(pd.Series)
-                                df_merged = df_actual.merge(df_prev, on=["Aula", "Grado", "Sección", "Estudiante", "Curso"], suffixes=("_actual", "_prev"), how="left")
-                                df_merged["Capítulos completados_prev"] = df_merged["Capítulos completados_prev"].fillna(0)
-                                df_merged["Total capítulos_prev"] = df_merged["Total capítulos_prev"].fillna(0)
-                                df_merged["Avance"] = df_merged.apply(lambda row: "Sí" if row["Capítulos completados_actual"] > row["Capítulos completados_prev"] else "No", axis=1)
-                                df_avance = df_merged[["Aula", "Grado", "Sección", "Estudiante", "Curso", "Capítulos completados_actual", "Total capítulos_actual", "Capítulos completados_prev", "Total capítulos_prev", "Avance"]]
-                                df_avance.to_excel(writer_avances, sheet_name=sheet_name, index=False)
-                            else:
-                                df_actual["Avance"] = "N/A (primera ejecución)"
-                                df_avance = df_actual[["Aula", "Grado", "Sección", "Estudiante", "Curso", "Capítulos completados", "Total capítulos", "Avance"]]
-                                df_avance.to_excel(writer_avances, sheet_name=sheet_name, index=False)
-
-                            plataformas = df_actual["Curso"].unique()
-                            for plataforma in plataformas:
-                                if "principiante" in plataforma.lower() or "beginner" in plataforma.lower() or "básico" in plataforma.lower() or "intro" in plataforma.lower():
-                                    plat_name = "Qureo"
-                                elif "javascript" in plataforma.lower() or "js" in plataforma.lower():
-                                    plat_name = "Curso de JavaScript"
-                                else:
-                                    continue
-
-                                df_plataforma = df_actual[df_actual["Curso"] == plataforma]
-                                if df_plataforma.empty:
-                                    continue
-
-                                resumen_por_aula = df_plataforma.groupby("Aula").agg(
-                                    Total_Estudiantes=("Estudiante", "count"),
-                                    Avance_Promedio=("Capítulos completados", "mean"),
-                                    Capítulo_Más_Común=("Capítulos completados", lambda x: x.mode()[0] if not x.mode().empty else 0),
-                                    Total_Capítulos=("Total capítulos", "max")
-                                ).reset_index()
-                                resumen_por_aula["Mensaje_Mayoría"] = resumen_por_aula.apply(
-                                    lambda row: f"La mayoría de estudiantes está por el capítulo {int(row['Capítulo_Más_Común'])} de {int(row['Total_Capítulos'])}", axis=1
-                                )
-                                resumen_sheet_name = self.truncate_sheet_name(colegio, f"_Resumen_{plat_name}")
-                                resumen_por_aula.to_excel(writer_avances, sheet_name=resumen_sheet_name, index=False)
-                                logger.info(f"Resumen por aula generado para {colegio} ({plat_name}): {resumen_por_aula}")
-
-                    os.makedirs("graficos", exist_ok=True)
-                    colegios_list = list(datos_por_colegio.keys())
-                    avances_globales_qureo = [0] * len(colegios_list)
-                    avances_globales_js = [0] * len(colegios_list)
-
-                    for idx, (colegio, df_actual) in enumerate(datos_por_colegio.items()):
-                        df_actual["Capítulos completados"] = pd.to_numeric(df_actual["Capítulos completados"], errors='coerce').fillna(0)
-                        plataformas = df_actual["Curso"].unique()
-
-                        for plataforma in plataformas:
-                            if "principiante" in plataforma.lower() or "beginner" in plataforma.lower() or "básico" in plataforma.lower() or "intro" in plataforma.lower():
-                                plat_name = "Qureo"
-                            elif "javascript" in plataforma.lower() or "js" in plataforma.lower():
-                                plat_name = "Curso de JavaScript"
-                            else:
-                                continue
-
-                            df_plataforma = df_actual[df_actual["Curso"] == plataforma]
-                            if df_plataforma.empty:
-                                continue
-
-                            resumen_por_aula = df_plataforma.groupby("Aula")["Capítulos completados"].mean().reset_index()
-                            avance_promedio = df_plataforma["Capítulos completados"].mean()
-                            if plat_name == "Qureo":
-                                avances_globales_qureo[idx] = avance_promedio
-                            else:
-                                avances_globales_js[idx] = avance_promedio
-
-                            plt.figure(figsize=(10, 6))
-                            plt.bar(resumen_por_aula["Aula"], resumen_por_aula["Capítulos completados"])
-                            plt.title(f"Avance Promedio por Aula en {colegio} ({plat_name})")
-                            plt.xlabel("Aula")
-                            plt.ylabel("Capítulos Completados (Promedio)")
-                            plt.xticks(rotation=45)
-                            plt.tight_layout()
-                            grafico_path = f"graficos/avance_{self.truncate_sheet_name(colegio)}_{self.truncate_sheet_name(plat_name)}.png"
-                            plt.savefig(grafico_path)
-                            plt.close()
-                            logger.info(f"Gráfico generado para {colegio} ({plat_name}): {grafico_path}")
-
-                    plt.figure(figsize=(12, 6))
-                    x = range(len(colegios_list))
-                    plt.bar([i - 0.2 for i in x], avances_globales_qureo, width=0.4, label="Qureo", color="blue")
-                    plt.bar([i + 0.2 for i in x], avances_globales_js, width=0.4, label="Curso de JavaScript", color="purple")
-                    plt.title("Avance Promedio por Colegio (Global)")
-                    plt.xlabel("Colegio")
-                    plt.ylabel("Capítulos Completados (Promedio)")
-                    plt.xticks(x, colegios_list, rotation=90)
-                    plt.yticks(np.arange(0, max(max(avances_globales_qureo, default=0), max(avances_globales_js, default=0)) + 1, 1))
-                    plt.legend()
-                    plt.tight_layout()
-                    grafico_global_path = "graficos/avance_global.png"
-                    plt.savefig(grafico_global_path)
-                    plt.close()
-                    logger.info(f"Gráfico global generado: {grafico_global_path}")
+                    graficos = escritor.cerrar()
+                    with self.metricas.medir("graficos"):
+                        self.generar_graficos(graficos)
 
+                    self.almacen.finalizar_ejecucion(self.run_id)
                     self.update_gui("¡Proceso completado! Reporte de avances y gráficos generados.")
-                    self.master.after(0, lambda: messagebox.showinfo("Éxito", f"Avances exportados a 'reporte_avances.xlsx'. Gráficos en carpeta 'graficos/'. Errores en: {', '.join(colegios_con_errores) if colegios_con_errores else 'Ningún colegio'}"))
+                    self.show_info("Éxito", f"Avances exportados a '{self.ruta_reporte}'. Gráficos en carpeta '{self.directorio_graficos}/'. Errores en: {', '.join(colegios_con_errores) if colegios_con_errores else 'Ningún colegio'}")
 
                 except Exception as e:
                     logger.error(f"Error al generar reporte o gráficos: {str(e)}")
                     self.show_error("Error", f"Error al generar reporte o gráficos: {str(e)}.")
                     self.update_gui("Error al generar reporte o gráficos")
-                    self.master.after(0, lambda: self.boton_iniciar.config(state="normal"))
-                    return
+                    self.habilitar_botones()
+                    return SALIDA_ERROR
 
             else:
+                escritor.cerrar()
                 self.update_gui("Error: No se procesó ningún colegio correctamente.")
                 self.show_error("Error", "No se pudo procesar ningún colegio.")
-                self.master.after(0, lambda: self.boton_iniciar.config(state="normal"))
+                self.habilitar_botones()
 
             if estudiantes_omitidos_global:
                 logger.error(f"Estudiantes omitidos: {estudiantes_omitidos_global}")
                 self.show_error("Advertencia", f"Se omitieron {len(estudiantes_omitidos_global)} estudiantes: {', '.join(estudiantes_omitidos_global)}")
 
             logger.info(f"Tiempo total: {time.time() - start_time} segundos")
-            self.master.after(0, lambda: self.boton_iniciar.config(state="normal"))
+            self.metricas.registrar_lentos(TOP_LENTOS)
+            self.habilitar_botones()
+            if not colegios_con_datos:
+                return SALIDA_ERROR
+            return SALIDA_PARCIAL if colegios_con_errores or estudiantes_omitidos_global else SALIDA_OK
 
         except Exception as e:
             logger.error(f"Error al leer el archivo XLSX: {str(e)}")
-            self.show_error("Error", f"Error al leer 'credenciales_colegios.xlsx': {str(e)}.")
+            self.show_error("Error", f"Error al leer '{self.ruta_credenciales}': {str(e)}.")
             self.update_gui("Error en el archivo XLSX")
-            self.master.after(0, lambda: self.boton_iniciar.config(state="normal"))
+            self.habilitar_botones()
+            return SALIDA_ERROR
+        finally:
+            if self.ruta_metricas and self.metricas.fases:
+                try:
+                    self.metricas.exportar(self.ruta_metricas, TOP_LENTOS)
+                    logger.info(f"Métricas de tiempo exportadas a {self.ruta_metricas}")
+                except OSError as e:
+                    logger.warning(f"No se pudieron exportar las métricas a {self.ruta_metricas}: {str(e)}")
+            if self.almacen is not None:
+                self.almacen.cerrar()
+                self.almacen = None
+            if self.historial is not None:
+                self.historial.cerrar()
+                self.historial = None
+
+# Daemon de navegadores: Playwright y Chromium ya abiertos para ejecuciones cortas y repetidas
+class ConexionDaemon:
+    """Envía eventos como líneas JSON a un cliente del daemon; varios hilos pueden enviar a la vez."""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.cerrada = False
+        self._lock = threading.Lock()
+
+    def enviar(self, evento):
+        linea = (json.dumps(evento, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+        with self._lock:
+            if self.cerrada:
+                return False
+            try:
+                self.wfile.write(linea)
+                self.wfile.flush()
+            except OSError:
+                self.cerrada = True
+                return False
+        return True
+
+
+class AlmacenRemoto:
+    """Sustituye a AlmacenResultados dentro del daemon: los estudiantes se envían al cliente, que los guarda."""
+
+    def __init__(self, conexion, posicion, guardados, anteriores):
+        self.conexion = conexion
+        self.posicion = posicion
+        self.guardados = guardados
+        self.anteriores = anteriores
+
+    def estudiantes_guardados(self, run_id, colegio):
+        return {url: [tuple(fila) for fila in filas] for url, filas in self.guardados.items()}
+
+    def huellas_anteriores(self, run_id, colegio):
+        return {url: (huella, copias, [tuple(fila) for fila in filas]) for url, (huella, copias, filas) in self.anteriores.items()}
+
+    def guardar_estudiante(self, run_id, colegio, url, orden, nombre, filas, omitido, huella=None, copias=0):
+        self.conexion.enviar({
+            "tipo": "estudiante", "posicion": self.posicion, "url": url, "orden": orden, "nombre": nombre,
+            "filas": [list(fila) for fila in filas], "omitido": omitido, "huella": huella, "copias": copias
+        })
+
+
+class AppDaemon(QureoApp):
+    """QureoApp de un colegio procesado en el daemon: guarda los estudiantes y publica el progreso en la
+    conexión del cliente que lo pidió."""
+
+    def __init__(self, conexion, posicion, guardados, anteriores, ajustes, politica_recursos):
+        super().__init__()
+        self.conexion = conexion
+        self.posicion = posicion
+        self.almacen = AlmacenRemoto(conexion, posicion, guardados, anteriores)
+        self.run_id = "daemon"
+        self.politica_recursos = politica_recursos
+        # Ajustes del cliente; los que falten o no sean válidos quedan con los del daemon
+        if isinstance(ajustes.get("paginas"), int):
+            self.paginas_por_colegio = max(1, ajustes["paginas"])
+        if ajustes.get("modo") in ("dom", "red"):
+            self.modo_extraccion = ajustes["modo"]
+
+    def estudiantes_anteriores(self, colegio):
+        # El cliente solo las envía si tiene activa la detección de cambios
+        return self.almacen.huellas_anteriores(self.run_id, colegio)
+
+    def ajustar_progreso(self, maximo=0, valor=0):
+        self.conexion.enviar({"tipo": "progreso", "posicion": self.posicion, "maximo": maximo, "valor": valor})
+
+    def estudiante_procesado(self, posicion, total_colegios):
+        self.ajustar_progreso(valor=1)
+
+
+class PeticionDaemon:
+    """Colegios de una misma petición de extracción; `listo` se activa cuando terminan todos."""
+
+    def __init__(self, conexion, total_colegios, guardados, anteriores, ajustes, pendientes):
+        self.conexion = conexion
+        self.total_colegios = total_colegios
+        self.guardados = guardados
+        self.anteriores = anteriores
+        self.ajustes = ajustes
+        self.pendientes = pendientes
+        self.listo = threading.Event()
+        self._lock = threading.Lock()
+        if pendientes == 0:
+            self.listo.set()
+
+    def colegio_terminado(self):
+        with self._lock:
+            self.pendientes -= 1
+            if self.pendientes <= 0:
+                self.listo.set()
+
+
+class DaemonNavegadores:
+    """Servidor local (127.0.0.1) con `navegadores` hilos, cada uno con su Chromium ya lanzado, que atienden
+    una cola de colegios. Protocolo: una línea JSON por petición ({"token", "accion": "salud" | "extraer" |
+    "detener", ...}) y una línea JSON por evento de respuesta. Los contextos se crean por colegio a partir de
+    la sesión guardada en CacheSesiones, así que un colegio ya autenticado no repite el login."""
+
+    def __init__(self, navegadores, archivo=ARCHIVO_DAEMON, puerto=PUERTO_DAEMON, inactividad=INACTIVIDAD_DAEMON):
+        self.navegadores = max(1, navegadores)
+        self.archivo = archivo
+        self.puerto = puerto
+        self.inactividad = inactividad
+        self.token = secrets.token_hex(16)
+        self.trabajos = queue.Queue()  # (peticion, posicion, colegio, usuario, contraseña)
+        self.detenido = threading.Event()
+        self.politica_recursos = PoliticaRecursos(TIPOS_RECURSO_BLOQUEADOS, HOSTS_BLOQUEADOS, HOSTS_PERMITIDOS) if BLOQUEAR_RECURSOS else None
+        self.servidor = None
+        self._lock = threading.Lock()
+        self.listos = 0
+        self.activos = 0
+        self.atendidos = 0
+        self.ultima_actividad = time.time()
+
+    def ejecutar(self):
+        """Atiende peticiones hasta recibir "detener" o superar el tiempo de inactividad."""
+        daemon = self
+
+        class Manejador(socketserver.StreamRequestHandler):
+            def handle(self):
+                daemon.atender(self.rfile, self.wfile)
+
+        class Servidor(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self.servidor = Servidor(("127.0.0.1", self.puerto), Manejador)
+        self.puerto = self.servidor.server_address[1]
+        # El archivo lleva el token: solo lectura para el usuario actual
+        with open(os.open(self.archivo, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8") as f:
+            json.dump({"host": "127.0.0.1", "puerto": self.puerto, "token": self.token, "pid": os.getpid()}, f)
+
+        hilos = [threading.Thread(target=self.trabajador, name=f"navegador-{i}", daemon=True) for i in range(self.navegadores)]
+        hilos.append(threading.Thread(target=self.vigilar_inactividad, name="inactividad", daemon=True))
+        for hilo in hilos:
+            hilo.start()
+        logger.info(f"Daemon de navegadores en 127.0.0.1:{self.puerto} con {self.navegadores} navegador(es); datos de conexión en {self.archivo}")
+        try:
+            self.servidor.serve_forever(poll_interval=0.5)
+        finally:
+            self.detenido.set()
+            for hilo in hilos:
+                hilo.join()
+            self.servidor.server_close()
+            try:
+                os.remove(self.archivo)
+            except OSError:
+                pass
+            logger.info(f"Daemon de navegadores detenido tras {self.atendidos} colegio(s) atendido(s).")
+
+    def detener(self):
+        threading.Thread(target=self.servidor.shutdown, daemon=True).start()
+
+    def vigilar_inactividad(self):
+        while not self.detenido.wait(5):
+            with self._lock:
+                inactivo = self.activos == 0 and self.trabajos.empty() and time.time() - self.ultima_actividad > self.inactividad
+            if inactivo:
+                logger.info(f"Daemon de navegadores inactivo durante {self.inactividad:.0f} s, se detiene.")
+                self.detener()
+                return
+
+    def trabajador(self):
+        try:
+            with sync_playwright() as p:
+                browser = p.chromium.launch(headless=True)
+                with self._lock:
+                    self.listos += 1
+                try:
+                    while not self.detenido.is_set():
+                        try:
+                            trabajo = self.trabajos.get(timeout=0.5)
+                        except queue.Empty:
+                            continue
+                        if not browser.is_connected():
+                            logger.warning("Chromium se cerró, se vuelve a lanzar.")
+                            browser = p.chromium.launch(headless=True)
+                        self.ejecutar_trabajo(browser, *trabajo)
+                finally:
+                    with self._lock:
+                        self.listos -= 1
+                    try:
+                        browser.close()
+                    except Exception:
+                        pass
+        except Exception as e:
+            logger.error(f"Error al iniciar el navegador en un hilo del daemon: {str(e)}")
+
+    def ejecutar_trabajo(self, browser, peticion, posicion, colegio, usuario, contrasena):
+        with self._lock:
+            self.activos += 1
+        try:
+            if peticion.conexion.cerrada:
+                return  # el cliente se desconectó; no tiene sentido extraer el colegio
+            app = AppDaemon(
+                peticion.conexion, posicion, peticion.guardados.get(str(posicion), {}),
+                peticion.anteriores.get(str(posicion), {}), peticion.ajustes, self.politica_recursos
+            )
+            evento = {"tipo": "colegio", "posicion": posicion, "filas": [], "omitidos": [], "error": None}
+            try:
+                df_datos, omitidos = app.procesar_colegio(browser, posicion, colegio, usuario, contrasena, peticion.total_colegios)
+                evento.update(
+                    filas=[list(fila) for fila in df_datos[AcumuladorFilas.COLUMNAS].itertuples(index=False, name=None)],
+                    omitidos=omitidos
+                )
+            except Exception as e:
+                logger.error(f"Error general en {colegio}: {str(e)}")
+                evento["error"] = str(e)
+            evento["metricas"] = app.metricas.estado()
+            peticion.conexion.enviar(evento)
+        finally:
+            with self._lock:
+                self.activos -= 1
+                self.atendidos += 1
+                self.ultima_actividad = time.time()
+            peticion.colegio_terminado()
+
+    def atender(self, rfile, wfile):
+        conexion = ConexionDaemon(wfile)
+        try:
+            peticion = json.loads(rfile.readline())
+        except ValueError:
+            conexion.enviar({"ok": False, "error": "petición inválida"})
+            return
+        if not hmac.compare_digest(str(peticion.get("token", "")), self.token):
+            conexion.enviar({"ok": False, "error": "token inválido"})
+            return
+        with self._lock:
+            self.ultima_actividad = time.time()
+
+        accion = peticion.get("accion")
+        if accion == "salud":
+            with self._lock:
+                conexion.enviar({
+                    "ok": True, "pid": os.getpid(), "navegadores": self.navegadores, "navegadores_listos": self.listos,
+                    "trabajos_en_cola": self.trabajos.qsize(), "trabajos_activos": self.activos, "atendidos": self.atendidos,
+                    "inactivo_s": round(time.time() - self.ultima_actividad, 1)
+                })
+        elif accion == "detener":
+            conexion.enviar({"ok": True})
+            self.detener()
+        elif accion == "extraer":
+            colegios = peticion.get("colegios", [])
+            trabajo = PeticionDaemon(
+                conexion, peticion.get("total_colegios", len(colegios)), peticion.get("guardados", {}),
+                peticion.get("anteriores", {}), peticion.get("ajustes", {}), len(colegios)
+            )
+            for posicion, colegio, usuario, contrasena in colegios:
+                self.trabajos.put((trabajo, posicion, colegio, usuario, contrasena))
+            trabajo.listo.wait()
+            conexion.enviar({"tipo": "fin"})
+        else:
+            conexion.enviar({"ok": False, "error": f"acción desconocida: {accion}"})
+
+
+class ClienteDaemon:
+    """Cliente de DaemonNavegadores. Lee el puerto y el token del archivo que escribe el daemon."""
+
+    def __init__(self, archivo=ARCHIVO_DAEMON, timeout_conexion=1.0):
+        with open(archivo, encoding="utf-8") as f:
+            datos = json.load(f)
+        self.host = datos["host"]
+        self.puerto = datos["puerto"]
+        self.token = datos["token"]
+        self.timeout_conexion = timeout_conexion
+
+    @classmethod
+    def disponible(cls, archivo=ARCHIVO_DAEMON):
+        """Un cliente si el daemon responde a la comprobación de salud, o None."""
+        try:
+            cliente = cls(archivo)
+            cliente.salud()
+            return cliente
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _peticion(self, accion, timeout=None, **datos):
+        """Envía la petición y genera los eventos de respuesta hasta que el daemon cierra la conexión."""
+        with socket.create_connection((self.host, self.puerto), timeout=self.timeout_conexion) as conexion:
+            conexion.settimeout(timeout)
+            with conexion.makefile("rwb") as archivo:
+                archivo.write((json.dumps({"token": self.token, "accion": accion, **datos}, default=str) + "\n").encode("utf-8"))
+                archivo.flush()
+                for linea in archivo:
+                    yield json.loads(linea)
+
+    def _respuesta(self, accion):
+        respuestas = list(self._peticion(accion, timeout=10))
+        if not respuestas or not respuestas[0].get("ok"):
+            raise ValueError(respuestas[0].get("error") if respuestas else "sin respuesta del daemon")
+        return respuestas[0]
+
+    def salud(self):
+        return self._respuesta("salud")
+
+    def detener(self):
+        return self._respuesta("detener")
+
+    def extraer(self, colegios, total_colegios, guardados=None, anteriores=None, ajustes=None):
+        """Genera los eventos ("progreso", "estudiante", "colegio") de la extracción de [(posicion, colegio, usuario, contraseña)].
+        `ajustes` ({"paginas", "modo"}) reemplaza los del daemon para esta petición."""
+        for evento in self._peticion("extraer", colegios=colegios, total_colegios=total_colegios,
+                                     guardados=guardados or {}, anteriores=anteriores or {}, ajustes=ajustes or {}):
+            if evento.get("tipo") == "fin":
+                return
+            if "ok" in evento and not evento["ok"]:
+                raise ValueError(evento.get("error"))
+            yield evento
+        raise OSError("El daemon cerró la conexión antes de terminar")
+
 
 # Función para mostrar una pantalla de carga
 def mostrar_splash(callback):
+    import tkinter as tk
+    from PIL import Image, ImageTk
+
     splash = tk.Tk()
     splash.overrideredirect(True)
     splash.geometry("600x400+500+200")
@@ -556,11 +2989,175 @@ def mostrar_splash(callback):
     splash.after(3000, cerrar_splash)
     splash.mainloop()
 
+def iniciar_aplicacion(opciones=None, **rutas):
+    """Abre la ventana principal de la aplicación (modo GUI). `opciones` ({atributo: valor}) trae las
+    opciones de la línea de comandos (--reanudar, --incremental, --desde, --metricas)."""
+    import tkinter as tk
+
+    root = tk.Tk()
+    app = QureoApp(root, **rutas)
+    for atributo, valor in (opciones or {}).items():
+        setattr(app, atributo, valor)
+    app.reanudar_al_iniciar = app.reanudar
+    root.mainloop()
+
+def leer_shard(texto):
+    """Convierte 'i/N' (1 <= i <= N) en (i, N) para --shard."""
+    try:
+        indice, total = (int(v) for v in texto.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{texto}' no tiene el formato i/N")
+    if not 1 <= indice <= total:
+        raise argparse.ArgumentTypeError(f"'{texto}': el shard debe estar entre 1 y {total}")
+    return indice, total
+
+
+def leer_fecha(texto):
+    """Valida 'AAAA-MM-DD' para --desde antes de empezar, en lugar de fallar al escribir el reporte."""
+    try:
+        fecha_a_ts(texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{texto}' no es una fecha AAAA-MM-DD")
+    return texto
+
+def ejecutar_shards_locales(args, app):
+    """Lanza un proceso por shard (cada uno con su navegador), espera a que terminen y combina los parciales."""
+    num_shards = max(1, args.procesos)
+    rutas_parciales = [PLANTILLA_PARCIAL.format(i=i, n=num_shards) for i in range(1, num_shards + 1)]
+    # La asignación se calcula una vez aquí y todos los shards la leen del mismo archivo
+    ruta_asignacion = args.asignacion or ARCHIVO_ASIGNACION
+    if app.escribir_asignacion(num_shards, ruta_asignacion) != SALIDA_OK:
+        return SALIDA_ERROR
+    procesos = []
+    for indice, ruta in enumerate(rutas_parciales, 1):
+        comando = [sys.executable, os.path.abspath(__file__), "--headless", "--shard", f"{indice}/{num_shards}",
+                   "--parcial", ruta, "--credenciales", args.credenciales, "--asignacion", ruta_asignacion]
+        for opcion, valor in (("--concurrencia", args.concurrencia), ("--paginas", args.paginas), ("--modo", args.modo), ("--metricas", args.metricas)):
+            if valor is not None:
+                comando += [opcion, str(valor)]
+        if args.reanudar:
+            comando.append("--reanudar")
+        if args.incremental:
+            comando.append("--incremental")
+        logger.info(f"Lanzando shard {indice}/{num_shards}: {' '.join(comando)}")
+        procesos.append(subprocess.Popen(comando))
+    codigos = [proceso.wait() for proceso in procesos]
+    logger.info(f"Códigos de salida de los shards: {codigos}")
+
+    codigo = app.procesar_colegios(parciales=rutas_parciales)
+    if codigo == SALIDA_OK and any(c != SALIDA_OK for c in codigos):
+        return SALIDA_PARCIAL
+    return codigo
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Reporte de avance de estudiantes en Qureo para múltiples colegios.")
+    parser.add_argument("--headless", action="store_true", help="Ejecuta el proceso sin interfaz gráfica (cron, servidores sin pantalla).")
+    parser.add_argument("--credenciales", default="credenciales_colegios.xlsx", help="Archivo XLSX con columnas Colegio, Usuario, Contraseña.")
+    parser.add_argument("--reporte-anterior", default="reporte_anterior.xlsx", help="Reporte de la ejecución anterior para calcular el avance.")
+    parser.add_argument("--salida", default="reporte_avances.xlsx", help="Ruta del reporte generado.")
+    parser.add_argument("--graficos", default="graficos", help="Carpeta donde se guardan los gráficos.")
+    parser.add_argument("--reanudar", action="store_true", help="Continúa la última ejecución interrumpida guardada en el almacén.")
+    parser.add_argument("--incremental", action="store_true", help="Solo visita los estudiantes cuya fila en la lista cambió desde la última ejecución.")
+    parser.add_argument("--concurrencia", type=int, help="Número de colegios procesados a la vez.")
+    parser.add_argument("--paginas", type=int, help="Páginas de estudiantes cargadas a la vez por colegio.")
+    parser.add_argument("--modo", choices=["dom", "red"], help="Modo de extracción de los cursos.")
+    parser.add_argument("--desde", type=leer_fecha, metavar="AAAA-MM-DD", help="Calcula el Avance contra la última ejecución hasta esa fecha en lugar de la anterior.")
+    parser.add_argument("--metricas", metavar="RUTA", help="Archivo de métricas de tiempo por fase (.json, o .prom/.txt para Prometheus).")
+    parser.add_argument("--tendencia", nargs="?", const="", metavar="COLEGIO", help="Imprime en CSV la evolución del avance por ejecución (de un colegio o de todos) y termina.")
+    shards = parser.add_mutually_exclusive_group()
+    shards.add_argument("--shard", type=leer_shard, metavar="i/N", help="Extrae solo los colegios del shard i de N y los guarda en un archivo parcial (sin reporte).")
+    shards.add_argument("--procesos", type=int, metavar="N", help="Lanza N shards en procesos locales y combina sus parciales en un solo reporte.")
+    shards.add_argument("--asignar", type=int, metavar="N", help="Reparte los colegios en N shards según el historial local, guarda la asignación en --asignacion y termina.")
+    shards.add_argument("--combinar", nargs="+", metavar="PARCIAL", help="Genera el reporte y los gráficos a partir de los archivos parciales de los shards.")
+    daemon = parser.add_mutually_exclusive_group()
+    daemon.add_argument("--daemon", action="store_true", help="Inicia el daemon de navegadores (un Chromium abierto por cada --concurrencia) y espera trabajos.")
+    daemon.add_argument("--usar-daemon", action="store_true", help="Extrae los colegios en el daemon de navegadores si está activo (en la GUI o con --headless).")
+    daemon.add_argument("--daemon-estado", action="store_true", help="Muestra el estado del daemon de navegadores y termina.")
+    daemon.add_argument("--daemon-detener", action="store_true", help="Detiene el daemon de navegadores y termina.")
+    parser.add_argument("--asignacion", metavar="RUTA", help=f"Archivo de asignación de colegios a shards, compartido por todas las máquinas (por defecto {ARCHIVO_ASIGNACION} con --asignar y --procesos).")
+    parser.add_argument("--parcial", metavar="RUTA", help=f"Archivo parcial del shard (por defecto {PLANTILLA_PARCIAL.format(i='i', n='N')}).")
+    return parser
+
+def main(argv=None):
+    """Punto de entrada. Sin --headless abre la GUI; con --headless devuelve un código SALIDA_*."""
+    global MAX_COLEGIOS_CONCURRENTES, TAMANO_POOL_PAGINAS, MODO_EXTRACCION, USAR_DAEMON
+
+    args = crear_parser().parse_args(argv)
+    if COMPARAR_DESDE:
+        try:
+            leer_fecha(COMPARAR_DESDE)
+        except argparse.ArgumentTypeError as e:
+            logger.error(f"QUREO_COMPARAR_DESDE no es válida: {str(e)}")
+            return SALIDA_ERROR
+    if args.concurrencia is not None:
+        MAX_COLEGIOS_CONCURRENTES = max(1, args.concurrencia)
+    if args.paginas is not None:
+        TAMANO_POOL_PAGINAS = max(1, args.paginas)
+    if args.modo is not None:
+        MODO_EXTRACCION = args.modo
+    if args.usar_daemon:
+        USAR_DAEMON = True
+
+    if args.daemon:
+        DaemonNavegadores(MAX_COLEGIOS_CONCURRENTES).ejecutar()
+        return SALIDA_OK
+    if args.daemon_estado or args.daemon_detener:
+        cliente = ClienteDaemon.disponible()
+        if cliente is None:
+            logger.error(f"El daemon de navegadores no está activo (archivo {ARCHIVO_DAEMON}).")
+            return SALIDA_ERROR
+        if args.daemon_estado:
+            print(json.dumps(cliente.salud(), ensure_ascii=False, indent=1))
+        else:
+            cliente.detener()
+        return SALIDA_OK
+
+    rutas = {
+        "ruta_credenciales": args.credenciales,
+        "ruta_reporte_anterior": args.reporte_anterior,
+        "ruta_reporte": args.salida,
+        "directorio_graficos": args.graficos
+    }
+    if args.tendencia is not None:
+        historial = HistorialAvances(RUTA_HISTORIAL)
+        try:
+            desde_ts = fecha_a_ts(args.desde) if args.desde else None
+            historial.tendencia(args.tendencia or None, desde_ts).to_csv(sys.stdout, index=False)
+        finally:
+            historial.cerrar()
+        return SALIDA_OK
+
+    # Opciones de ejecución que se aplican igual a la GUI y a --headless
+    opciones = {"reanudar": args.reanudar or REANUDAR, "incremental": args.incremental or INCREMENTAL}
+    if args.desde:
+        opciones["comparar_desde"] = args.desde
+    if args.metricas is not None:
+        opciones["ruta_metricas"] = args.metricas
+
+    if not (args.headless or args.shard or args.procesos or args.combinar or args.asignar):
+        mostrar_splash(lambda: iniciar_aplicacion(opciones, **rutas))
+        return SALIDA_OK
+
+    if not os.path.exists(args.credenciales):
+        logger.error(f"No se encontró '{args.credenciales}'. Crea el archivo con columnas: Colegio,Usuario,Contraseña.")
+        return SALIDA_ERROR
+    app = QureoApp(**rutas)
+    for atributo, valor in opciones.items():
+        setattr(app, atributo, valor)
+    with app.consumidor_eventos_cli():
+        if args.shard:
+            indice, num_shards = args.shard
+            if app.ruta_metricas:
+                app.ruta_metricas = ruta_con_sufijo(app.ruta_metricas, f".shard{indice}de{num_shards}")
+            return app.procesar_shard(indice, num_shards, args.parcial or PLANTILLA_PARCIAL.format(i=indice, n=num_shards), args.asignacion)
+        if args.asignar:
+            return app.escribir_asignacion(max(1, args.asignar), args.asignacion or ARCHIVO_ASIGNACION)
+        if args.procesos:
+            return ejecutar_shards_locales(args, app)
+        if args.combinar:
+            return app.procesar_colegios(parciales=args.combinar)
+        return app.procesar_colegios()
+
 # Punto de entrada del programa
 if __name__ == "__main__":
-    def iniciar_aplicacion():
-        root = tk.Tk()
-        app = QureoApp(root)
-        root.mainloop()
-
-    mostrar_splash(iniciar_aplicacion)
\ No newline at end of file
+    sys.exit(main())